@@ -0,0 +1,310 @@
+"""
+Benchmarks of the puzzle_tools strategies on fixed corpora of puzzles of
+each type, reporting nodes expanded, nodes per second, peak memory and
+wall time as JSON, so that runs before and after a change can be diffed.
+
+Run "python benchmark.py --output after.json --baseline before.json" to
+benchmark every corpus and fail if anything got slower.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+from mn_puzzle import MNPuzzle
+from puzzle_tools import (depth_first_solve, breadth_first_solve,
+                          bidirectional_solve, astar_solve, ida_star_solve)
+from search_stats import SearchStats
+from sudoku_puzzle import SudokuPuzzle
+from word_ladder_puzzle import WordLadderPuzzle, WordGraph
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import time
+
+
+def _depth_first_in_place(puzzle, stats=None):
+    # Return depth_first_solve(puzzle), searching in place.
+    #
+    # @type puzzle: Puzzle
+    # @type stats: SearchStats | None
+    # @rtype: PuzzleNode | None
+    return depth_first_solve(puzzle, in_place=True, stats=stats)
+
+
+# strategies by name
+STRATEGIES = {
+    "depth_first": depth_first_solve,
+    "depth_first_in_place": _depth_first_in_place,
+    "breadth_first": breadth_first_solve,
+    "bidirectional": bidirectional_solve,
+    "astar": astar_solve,
+    "ida_star": ida_star_solve,
+}
+
+
+def _sudoku(rows, propagate=False):
+    # Return the 9x9 SudokuPuzzle with rows, "*" for empty positions.
+    #
+    # @type rows: tuple[str]
+    # @type propagate: bool
+    # @rtype: SudokuPuzzle
+    return SudokuPuzzle(9, list("".join(rows)), set("123456789"), propagate)
+
+
+def _mn(from_grid):
+    # Return the MNPuzzle from from_grid to tiles 1, 2, ... in order
+    # with "*" last.
+    #
+    # @type from_grid: tuple[tuple[str]]
+    # @rtype: MNPuzzle
+    n, m = len(from_grid), len(from_grid[0])
+    labels = [str(i) for i in range(1, n * m)] + ["*"]
+    return MNPuzzle(from_grid, tuple(tuple(labels[r * m:(r + 1) * m])
+                                     for r in range(n)))
+
+
+def _peg(rows):
+    # Return the GridPegSolitairePuzzle with rows of markers.
+    #
+    # @type rows: tuple[str]
+    # @rtype: GridPegSolitairePuzzle
+    return GridPegSolitairePuzzle([list(row) for row in rows],
+                                  {"*", ".", "#"})
+
+
+# the words file read by _word_ladder, once per process
+_words = None
+
+
+def _word_ladder(from_word, to_word):
+    # Return the WordLadderPuzzle from from_word to to_word over the
+    # words file next to this module.
+    #
+    # @type from_word: str
+    # @type to_word: str
+    # @rtype: WordLadderPuzzle
+    global _words
+    if _words is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            "words")
+        with open(path) as f:
+            _words = WordGraph(f.read().split())
+    return WordLadderPuzzle(from_word, to_word, _words)
+
+
+_SEARCHES = ("depth_first", "depth_first_in_place")
+_SHORTEST = ("breadth_first", "bidirectional", "astar", "ida_star")
+
+# corpus name -> list of (case name, builder, builder arguments, strategy
+# names); cases are fixed, so runs on different trees are comparable
+CORPORA = {
+    "sudoku": [
+        ("easy", _sudoku,
+         (("53**7****", "6**195***", "*98****6*", "8***6***3", "4**8*3**1",
+           "7***2***6", "*6****28*", "***419**5", "****8**79"),),
+         _SEARCHES),
+        ("medium", _sudoku,
+         (("***7*8*1*", "**7*9***6", "9*31*****", "35*8**6*1", "*********",
+           "1*6**9*48", "*****12*7", "8***7*4**", "*6*3*2***"),),
+         _SEARCHES),
+        ("hard", _sudoku,
+         (("8********", "**36*****", "*7**9*2**", "*5***7***", "****457**",
+           "***1***3*", "**1****68", "**85***1*", "*9****4**"),),
+         _SEARCHES),
+        ("hard-propagate", _sudoku,
+         (("8********", "**36*****", "*7**9*2**", "*5***7***", "****457**",
+           "***1***3*", "**1****68", "**85***1*", "*9****4**"), True),
+         ("depth_first",)),
+    ],
+    "mn": [
+        ("3x3-length-8", _mn,
+         ((("*", "5", "3"), ("2", "1", "6"), ("4", "7", "8")),),
+         _SHORTEST),
+        ("3x3-length-16", _mn,
+         ((("4", "3", "6"), ("7", "*", "1"), ("8", "5", "2")),),
+         _SHORTEST),
+        ("3x3-length-24", _mn,
+         ((("*", "5", "1"), ("3", "6", "2"), ("4", "8", "7")),),
+         _SHORTEST),
+        ("4x4-length-24", _mn,
+         ((("1", "3", "*", "4"), ("7", "2", "8", "12"),
+           ("9", "5", "11", "15"), ("10", "6", "13", "14")),),
+         ("astar", "ida_star")),
+    ],
+    "peg": [
+        ("3x4", _peg, ((".***", "****", "****"),),
+         _SEARCHES + ("breadth_first",)),
+        ("5x5", _peg, (("**.**", "*****", "*****", "*****", "*****"),),
+         _SEARCHES),
+        ("english", _peg,
+         (("##***##", "##***##", "*******", "***.***", "*******",
+           "##***##", "##***##"),),
+         ("depth_first_in_place",)),
+    ],
+    "word_ladder": [
+        ("length-3", _word_ladder, ("cat", "dog"),
+         _SEARCHES + _SHORTEST[:3]),
+        ("length-5", _word_ladder, ("head", "tail"),
+         _SEARCHES + _SHORTEST[:3]),
+        ("length-11", _word_ladder, ("stone", "money"),
+         _SEARCHES + _SHORTEST[:3]),
+    ],
+}
+
+
+def benchmark_case(corpus, case, strategy):
+    """
+    Return the measurements of solving case of corpus by strategy, all
+    named as in CORPORA and STRATEGIES, in this process.
+
+    Peak memory is the largest resident set size this process has had,
+    in kilobytes, so it is only meaningful for a fresh process.
+
+    @type corpus: str
+    @type case: str
+    @type strategy: str
+    @rtype: dict[str, object]
+
+    >>> result = benchmark_case("mn", "3x3-length-8", "breadth_first")
+    >>> result["solved"], result["length"], result["nodes_expanded"] > 0
+    (True, 8, True)
+    """
+    _, build, args, _ = [c for c in CORPORA[corpus] if c[0] == case][0]
+    puzzle, stats = build(*args), SearchStats()
+    start = time.perf_counter()
+    node = STRATEGIES[strategy](puzzle, stats=stats)
+    seconds = time.perf_counter() - start
+    length = None
+    if node is not None:
+        length = 0
+        while node.children:
+            node, length = node.children[0], length + 1
+    return {"corpus": corpus, "case": case, "strategy": strategy,
+            "solved": node is not None, "length": length,
+            "nodes_expanded": stats.expansions,
+            "nodes_per_second": round(stats.expansions / seconds) if seconds
+            else None,
+            "duplicates": stats.duplicates,
+            "fail_fast_prunes": stats.fail_fast_prunes,
+            "max_depth": stats.max_depth, "max_frontier": stats.max_frontier,
+            "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "seconds": round(seconds, 6)}
+
+
+def run_benchmarks(corpora=None, strategies=None, isolate=True):
+    """
+    Return the measurements of benchmark_case for every case of corpora
+    and each of its strategies among strategies, all by default.
+
+    If isolate is True, each case runs in a new process of its own, so
+    its peak memory isn't that of an earlier case, and with a fixed seed
+    for hashing strings, so that sets of words, and so searches through
+    them, are in the same order from run to run.
+
+    @type corpora: list[str] | None
+    @type strategies: list[str] | None
+    @type isolate: bool
+    @rtype: list[dict[str, object]]
+
+    >>> results = run_benchmarks(["word_ladder"], ["bidirectional"], False)
+    >>> [(r["case"], r["length"]) for r in results]
+    [('length-3', 3), ('length-5', 5), ('length-11', 11)]
+    """
+    runs = [(corpus, case, strategy)
+            for corpus in (corpora or sorted(CORPORA))
+            for case, _, _, names in CORPORA[corpus]
+            for strategy in names
+            if strategies is None or strategy in strategies]
+    if not isolate:
+        return [benchmark_case(*run) for run in runs]
+    results, seed = [], os.environ.get("PYTHONHASHSEED")
+    context = multiprocessing.get_context("spawn")
+    # spawned processes read the seed from the environment
+    os.environ["PYTHONHASHSEED"] = "0"
+    try:
+        for run in runs:
+            with ProcessPoolExecutor(max_workers=1,
+                                     mp_context=context) as executor:
+                results.append(executor.submit(benchmark_case, *run).result())
+    finally:
+        if seed is None:
+            del os.environ["PYTHONHASHSEED"]
+        else:
+            os.environ["PYTHONHASHSEED"] = seed
+    return results
+
+
+def regressions(before, after, tolerance=0.25, slack=0.01):
+    """
+    Return the measurements in after of runs also in before that are
+    more than tolerance (a fraction) and slack seconds slower, expand
+    more nodes, or no longer solve their case.  slack keeps the noise
+    in timing the quickest cases from counting as a regression.
+
+    @type before: list[dict[str, object]]
+    @type after: list[dict[str, object]]
+    @type tolerance: float
+    @type slack: float
+    @rtype: list[dict[str, object]]
+
+    >>> old = [{"corpus": "mn", "case": "a", "strategy": "astar",
+    ...         "solved": True, "nodes_expanded": 10, "seconds": 1.0}]
+    >>> new = [dict(old[0], seconds=1.1), dict(old[0], case="b")]
+    >>> regressions(old, new)
+    []
+    >>> [r["seconds"] for r in regressions(old, [dict(old[0], seconds=2.0)])]
+    [2.0]
+    """
+    def run(r):
+        return r["corpus"], r["case"], r["strategy"]
+
+    earlier = {run(r): r for r in before}
+    worse = []
+    for r in after:
+        old = earlier.get(run(r))
+        if old is not None and (
+                old["solved"] and not r["solved"] or
+                r["nodes_expanded"] > old["nodes_expanded"] or
+                r["seconds"] > old["seconds"] * (1 + tolerance) + slack):
+            worse.append(r)
+    return worse
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(
+        description="Benchmark the puzzle_tools strategies on fixed "
+                    "corpora, writing the results as JSON.")
+    parser.add_argument("--corpus", action="append", choices=sorted(CORPORA),
+                        help="a corpus to run; all of them by default")
+    parser.add_argument("--strategy", action="append",
+                        choices=sorted(STRATEGIES),
+                        help="a strategy to run; all of them by default")
+    parser.add_argument("--output", help="file for the JSON; stdout "
+                                         "by default")
+    parser.add_argument("--baseline", help="JSON of an earlier run; exit "
+                                           "with status 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--no-isolate", action="store_true",
+                        help="run every case in this process")
+    args = parser.parse_args()
+    report = {"python": platform.python_version(),
+              "machine": platform.machine(),
+              "results": run_benchmarks(args.corpus, args.strategy,
+                                        not args.no_isolate)}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.baseline:
+        with open(args.baseline) as f:
+            worse = regressions(json.load(f)["results"], report["results"],
+                                args.tolerance)
+        for r in worse:
+            print("regression: {corpus} {case} {strategy}: {seconds}s, "
+                  "{nodes_expanded} nodes".format(**r), file=sys.stderr)
+        sys.exit(1 if worse else 0)
@@ -0,0 +1,197 @@
+"""
+Knuth's Algorithm X with dancing links, for exact cover problems: given
+rows that each cover some columns, choose rows covering every column
+exactly once.
+"""
+
+
+class DancingLinks:
+    """
+    An exact cover problem, held as a sparse matrix of doubly-linked
+    nodes that are unlinked as rows are chosen and relinked, in reverse
+    order, on the way back.
+    """
+
+    def __init__(self, columns, rows):
+        """
+        Create a new DancingLinks self with columns numbered 0 to
+        columns - 1, and rows, each the list of the columns it covers.
+
+        @type self: DancingLinks
+        @type columns: int
+        @type rows: list[list[int]]
+        @rtype: None
+        """
+        # node 0 is the root and nodes 1 to columns the column headers;
+        # every node has left, right, up and down links, its column's
+        # header and, for nodes in rows, the index of its row
+        count = columns + 1
+        self._left = [c - 1 for c in range(count)]
+        self._right = [c + 1 for c in range(count)]
+        self._left[0], self._right[-1] = columns, 0
+        self._up, self._down = list(range(count)), list(range(count))
+        self._column, self._row = list(range(count)), [-1] * count
+        # number of nodes in each column
+        self._size = [0] * count
+        left, right, up, down = self._left, self._right, self._up, self._down
+        for r, covered in enumerate(rows):
+            first = len(left)
+            for k, c in enumerate(covered):
+                node, header = first + k, c + 1
+                left.append(node - 1 if k else first + len(covered) - 1)
+                right.append(node + 1 if k < len(covered) - 1 else first)
+                up.append(up[header])
+                down.append(header)
+                down[up[header]] = node
+                up[header] = node
+                self._column.append(header)
+                self._row.append(r)
+                self._size[header] += 1
+
+    def solutions(self):
+        """
+        Yield, one at a time, each exact cover of DancingLinks self, as
+        the sorted list of the indices of its rows.
+
+        Each step branches on the column covered by the fewest rows left,
+        and the search keeps its own stack, so large problems do not
+        exhaust the recursion limit.
+
+        @type self: DancingLinks
+        @rtype: Iterator[list[int]]
+
+        >>> rows = [[0, 3], [0], [3], [1, 2], [1], [2]]
+        >>> len(list(DancingLinks(4, rows).solutions()))
+        4
+        >>> next(DancingLinks(4, rows).solutions())
+        [0, 3]
+        >>> list(DancingLinks(2, [[0]]).solutions())
+        []
+        """
+        right, down, column = self._right, self._down, self._column
+        # the node of each row chosen so far
+        chosen = []
+        descending = True
+        while True:
+            if descending:
+                if right[0] == 0:
+                    yield sorted(self._row[node] for node in chosen)
+                    descending = False
+                    continue
+                c = self._fewest()
+                self._cover(c)
+                node = down[c]
+                if node == c:
+                    self._uncover(c)
+                    descending = False
+                    continue
+                chosen.append(node)
+                self._cover_row(node)
+                continue
+            # back up to the latest choice with another row to try
+            if not chosen:
+                return
+            node = chosen.pop()
+            self._uncover_row(node)
+            c, node = column[node], down[node]
+            if node == c:
+                self._uncover(c)
+                continue
+            chosen.append(node)
+            self._cover_row(node)
+            descending = True
+
+    def count(self, limit=None):
+        """
+        Return the number of exact covers of DancingLinks self, counting
+        no further than limit if it is given.
+
+        @type self: DancingLinks
+        @type limit: int | None
+        @rtype: int
+
+        >>> rows = [[0, 3], [0], [3], [1, 2], [1], [2]]
+        >>> DancingLinks(4, rows).count(), DancingLinks(4, rows).count(2)
+        (4, 2)
+        """
+        found = 0
+        for _ in self.solutions():
+            found += 1
+            if found == limit:
+                break
+        return found
+
+    def _fewest(self):
+        # Return the header of a column of self with the fewest nodes.
+        #
+        # @type self: DancingLinks
+        # @rtype: int
+        right, size = self._right, self._size
+        best, c = right[0], right[0]
+        while c:
+            if size[c] < size[best]:
+                best = c
+                if size[c] <= 1:
+                    break
+            c = right[c]
+        return best
+
+    def _cover(self, c):
+        # Unlink column c of self, and every row with a node in it from
+        # the other columns that row covers.
+        #
+        # @type self: DancingLinks
+        # @type c: int
+        # @rtype: None
+        left, right, up, down = self._left, self._right, self._up, self._down
+        column, size = self._column, self._size
+        right[left[c]], left[right[c]] = right[c], left[c]
+        i = down[c]
+        while i != c:
+            j = right[i]
+            while j != i:
+                down[up[j]], up[down[j]] = down[j], up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def _uncover(self, c):
+        # Undo _cover(c) on self.
+        #
+        # @type self: DancingLinks
+        # @type c: int
+        # @rtype: None
+        left, right, up, down = self._left, self._right, self._up, self._down
+        column, size = self._column, self._size
+        i = up[c]
+        while i != c:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[c]] = left[right[c]] = c
+
+    def _cover_row(self, node):
+        # Cover the columns of self covered by the row of node, other than
+        # the column of node itself.
+        #
+        # @type self: DancingLinks
+        # @type node: int
+        # @rtype: None
+        j = self._right[node]
+        while j != node:
+            self._cover(self._column[j])
+            j = self._right[j]
+
+    def _uncover_row(self, node):
+        # Undo _cover_row(node) on self.
+        #
+        # @type self: DancingLinks
+        # @type node: int
+        # @rtype: None
+        j = self._left[node]
+        while j != node:
+            self._uncover(self._column[j])
+            j = self._left[j]
@@ -1,4 +1,6 @@
 from puzzle import Puzzle
+import random
+import struct
 
 
 class GridPegSolitairePuzzle(Puzzle):
@@ -22,16 +24,182 @@ class GridPegSolitairePuzzle(Puzzle):
         assert all([len(x) == len(marker[0]) for x in marker[1:]])
         assert all([all(x in marker_set for x in row) for row in marker])
         assert all([x == "*" or x == "." or x == "#" for x in marker_set])
-        self._marker, self._marker_set = marker, marker_set
+        self._marker_set = marker_set
+        # the board is kept as a bitmask of pegs, with bit
+        # (row * width + column) standing for that cell
+        self._layout = _layout(marker)
+        self._pegs = _cells_marked(marker, "*")
+        # what _Layout.last_cells gives for the pegs, the same for every
+        # configuration reached by jumps; None until fail_fast needs it
+        self._last_cells = None
+        # the pegs and their images under each of the layout's
+        # symmetries, packed into one int by _Layout.images, kept up to
+        # date by every jump once canonical_key first needs them, and
+        # None until then
+        self._images = None
+        # the Zobrist hash of the pegs, kept up to date by every jump
+        # once state_hash first needs it, and None until then
+        self._hash = None
+
+    @classmethod
+    def _from_pegs(cls, pegs, layout, marker_set, last_cells=None,
+                   images=None, h=None):
+        # Return a new GridPegSolitairePuzzle with pegs on the board
+        # described by layout, skipping the checks done by __init__.
+        #
+        # @type pegs: int
+        # @type layout: _Layout
+        # @type marker_set: set[str]
+        # @type last_cells: (int, int) | None
+        # @type images: int | None
+        # @type h: int | None
+        # @rtype: GridPegSolitairePuzzle
+        puzzle = cls.__new__(cls)
+        puzzle._pegs, puzzle._layout = pegs, layout
+        puzzle._marker_set, puzzle._last_cells = marker_set, last_cells
+        puzzle._images, puzzle._hash = images, h
+        return puzzle
+
+    @property
+    def _marker(self):
+        # The board of GridPegSolitairePuzzle self as rows of markers:
+        # "#" for unused, "*" for peg, "." for empty.
+        #
+        # @type self: GridPegSolitairePuzzle
+        # @rtype: list[list[str]]
+        layout, pegs = self._layout, self._pegs
+        marker = []
+        for row in range(layout.height):
+            marker.append([])
+            for column in range(layout.width):
+                bit = 1 << (row * layout.width + column)
+                if layout.unused & bit:
+                    marker[-1].append("#")
+                elif pegs & bit:
+                    marker[-1].append("*")
+                else:
+                    marker[-1].append(".")
+        return marker
 
     def __eq__(self, other):
         """
-        Return that
+        Return whether GridPegSolitairePuzzle self is equivalent to other.
+
         @type self: GridPegSolitairePuzzle
         @type other: GridPegSolitairePuzzle | Any
         @rtype: bool
+
+        >>> grid = [["*", "*", "."], ["#", "*", "*"]]
+        >>> g1 = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> g2 = GridPegSolitairePuzzle([r[:] for r in grid], {"*", ".", "#"})
+        >>> g1.__eq__(g2)
+        True
+        >>> grid[0] = [".", ".", "*"]
+        >>> g1.__eq__(GridPegSolitairePuzzle(grid, {"*", ".", "#"}))
+        False
+        """
+        return (type(self) == type(other) and
+                self._layout is other._layout and
+                self._pegs == other._pegs and
+                self._marker_set == other._marker_set)
+
+    __hash__ = Puzzle.__hash__
+
+    def __reduce__(self):
+        """
+        Return how to rebuild GridPegSolitairePuzzle self when it is
+        unpickled, such as when sent to or from a worker process.  Only
+        the rows of markers of the current board and the marker set are
+        sent; the jump and symmetry tables for the board's shape are
+        rebuilt, or reused if the receiving process already has them.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: tuple
+        """
+        return GridPegSolitairePuzzle, (self._marker, self._marker_set)
+
+    def state_key(self):
+        """
+        Return a bitmask of the pegs of GridPegSolitairePuzzle self, with
+        bit (row * width + column) set iff that cell holds a peg.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: int
+
+        >>> grid = [["*", "."], ["#", "*"]]
+        >>> GridPegSolitairePuzzle(grid, {"*", ".", "#"}).state_key()
+        9
+        """
+        return self._pegs
+
+    def state_hash(self):
+        """
+        Return the Zobrist hash of the pegs of GridPegSolitairePuzzle
+        self: the exclusive or of a fixed random number for each cell
+        holding a peg, kept up to date by apply and undo.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: int
+
+        >>> grid = [["."] * 8 for _ in range(8)]
+        >>> grid[0][0] = grid[0][5] = "*"
+        >>> g1 = GridPegSolitairePuzzle(grid, {"*", "."})
+        >>> grid[0][0], grid[7][5] = ".", "*"
+        >>> g2 = GridPegSolitairePuzzle(grid, {"*", "."})
+        >>> g1.state_hash() == g2.state_hash()
+        False
+        >>> line = GridPegSolitairePuzzle([["*", "*", "."]], {"*", "."})
+        >>> before = line.state_hash()
+        >>> line.apply((3, 4, 7))
+        >>> other = GridPegSolitairePuzzle([[".", ".", "*"]], {"*", "."})
+        >>> line.state_hash() == other.state_hash()
+        True
+        >>> line.undo((3, 4, 7))
+        >>> line.state_hash() == before
+        True
         """
-        return self._marker == other._marker and self._marker_set == other. _marker_set
+        if self._hash is None:
+            self._hash = self._layout.hash(self._pegs)
+        return self._hash
+
+    def canonical_key(self):
+        """
+        Return the smallest state_key among the rotations and reflections
+        of GridPegSolitairePuzzle self that leave its "#" cells in place.
+
+        The images of the pegs under each of them are found once, then
+        updated by every jump with the images of its three cells, so the
+        key costs one unpacking of those images rather than a pass over
+        the board for each.  That is still dearer than a state_key, so
+        symmetry only pays on boards where it prunes many dead ends.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: int
+
+        >>> left = [["*", "*", "."], ["*", ".", "."]]
+        >>> right = [[".", "*", "*"], [".", ".", "*"]]
+        >>> g1 = GridPegSolitairePuzzle(left, {"*", ".", "#"})
+        >>> g2 = GridPegSolitairePuzzle(right, {"*", ".", "#"})
+        >>> g1.canonical_key() == g2.canonical_key()
+        True
+        >>> g1.state_key() == g2.state_key()
+        False
+        """
+        if self._images is None:
+            self._images = self._layout.images(self._pegs)
+        return self._layout.smallest(self._images)
+
+    def __copy__(self):
+        """
+        Return a copy of GridPegSolitairePuzzle self that can be changed
+        independently.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: GridPegSolitairePuzzle
+        """
+        return GridPegSolitairePuzzle._from_pegs(
+            self._pegs, self._layout, self._marker_set, self._last_cells,
+            self._images, self._hash)
 
     def __str__(self):
         """
@@ -77,48 +245,69 @@ class GridPegSolitairePuzzle(Puzzle):
         >>> L2 = [GridPegSolitairePuzzle(grid, {"*", ".", "#"})]
         >>> len(L1) == len(L2)
         False
+        >>> line = GridPegSolitairePuzzle([["*", "*", "."]], {"*", ".", "#"})
+        >>> print(line.extensions()[0])
+        . . *
+        """
+        return Puzzle.extensions(self)
+
+    def moves(self):
+        """
+        Return list of the jumps that can be made on
+        GridPegSolitairePuzzle self, each a triple of bitmasks:
+        (start and middle cells, landing cell, all three cells).
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: list[(int, int, int)]
+
+        >>> line = GridPegSolitairePuzzle([["*", "*", "."]], {"*", ".", "#"})
+        >>> line.moves()
+        [(3, 4, 7)]
         """
-        marker, marker_set = self._marker, self._marker_set
         if self.is_solved():
             return []
+        pegs = self._pegs
+        # a jump needs pegs on its start and middle cells and an empty
+        # landing cell
+        return [jump for jump in self._layout.jumps
+                if pegs & jump[0] == jump[0] and not pegs & jump[1]]
+
+    def apply(self, move):
+        """
+        Make the jump move on GridPegSolitairePuzzle self, in place.
+
+        @type self: GridPegSolitairePuzzle
+        @type move: (int, int, int)
+        @rtype: None
+
+        >>> line = GridPegSolitairePuzzle([["*", "*", "."]], {"*", ".", "#"})
+        >>> line.apply((3, 4, 7))
+        >>> print(line)
+        . . *
+        >>> line.undo((3, 4, 7))
+        >>> print(line)
+        * * .
+        """
+        # a jump flips all three of its cells, and so does undoing it
+        self._pegs ^= move[2]
+        if self._images is not None:
+            self._images ^= self._layout.jump_images[move[2]]
+        if self._hash is not None:
+            self._hash ^= self._layout.jump_hashes[move[2]]
+
+    def undo(self, move):
+        """
+        Take back the jump move on GridPegSolitairePuzzle self, in place.
 
-        extensions_list = []
-        for row in range(len(marker) - 1):
-            for column in range(len(marker) - 1):
-
-                if column < len(marker) - 2 and marker[row][column] == "." and marker[row][column + 1] == "*" and marker[row][column + 2] == "*":
-                    new = marker
-                    new[row][column] = "*"
-                    new[row][column + 1] = "."
-                    new[row][column + 2] = "."
-                    z = GridPegSolitairePuzzle(new, marker_set)
-                    extensions_list.append(z)
-
-                if row < len(marker) - 2 and marker[row][column] == "*" and marker[row + 1][column] == "*" and marker[row + 2][column] == ".":
-                    new = marker
-                    new[row][column] = "."
-                    new[row + 1][column] = "."
-                    new[row + 2][column] = "*"
-                    z = GridPegSolitairePuzzle(new, marker_set)
-                    extensions_list.append(z)
-
-                if column < len(marker) - 2 and marker[row][column] == "*" and marker[row][column + 1] == "*" and marker[row][column + 2] == ".":
-                    new = marker
-                    new[row][column] = "."
-                    new[row][column + 1] = "."
-                    new[row][column + 2] = "*"
-                    z = GridPegSolitairePuzzle(new, marker_set)
-                    extensions_list.append(z)
-
-                if row < len(marker) - 2 and marker[row][column] == "." and marker[row + 1][column] == "*" and marker[row + 2][column] == "*":
-                    new = marker
-                    new[row][column] = "*"
-                    new[row + 1][column] = "."
-                    new[row + 2][column] = "."
-                    z = GridPegSolitairePuzzle(new, marker_set)
-                    extensions_list.append(z)
-
-        return extensions_list
+        @type self: GridPegSolitairePuzzle
+        @type move: (int, int, int)
+        @rtype: None
+        """
+        self._pegs ^= move[2]
+        if self._images is not None:
+            self._images ^= self._layout.jump_images[move[2]]
+        if self._hash is not None:
+            self._hash ^= self._layout.jump_hashes[move[2]]
 
     def is_solved(self):
         """
@@ -136,16 +325,301 @@ class GridPegSolitairePuzzle(Puzzle):
         >>> gridPuzzle.is_solved()
         False
         """
-        marker = self._marker
-        counter = 0
-        for row in marker:
-            for column in row:
-                if column == "*":
-                    counter += 1
-                elif counter >= 2:
-                    return False
-        if counter == 1:
-            return True
+        pegs = self._pegs
+        # exactly one bit set
+        return pegs != 0 and pegs & (pegs - 1) == 0
+
+    def fail_fast(self):
+        """
+        Return True iff GridPegSolitairePuzzle self can never be reduced
+        to a single peg.
+
+        Colour each cell by (row + column) % 3: the three cells of a jump
+        have different colours, so each jump changes the number of pegs
+        of every colour by one, and the same goes for (row - column) % 3.
+        These parities, flipping together, tell which cells the last peg
+        could be left on, the same for every configuration reached by
+        jumps, and when there are none.  For those cells there is also a
+        pagoda function, taking 1 on a set of cells including them that
+        no jump lands in without starting or jumping over one of them, so
+        that the number of pegs in the set can never go up: once none are
+        left, the last peg can't be left where it must be.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: bool
+
+        >>> line = GridPegSolitairePuzzle([["*", "*", ".", "."]], {"*", "."})
+        >>> line.fail_fast()
+        False
+        >>> line = GridPegSolitairePuzzle([["*", ".", ".", "*"]], {"*", "."})
+        >>> line.fail_fast()
+        True
+        >>> grid = [[".", "*", "*", "*", "*"]] + [["*"] * 5 for _ in range(4)]
+        >>> GridPegSolitairePuzzle(grid, {"*", "."}).fail_fast()
+        True
+        """
+        pegs = self._pegs
+        if pegs & (pegs - 1) == 0:
+            return pegs == 0
+        if self._last_cells is None:
+            self._last_cells = self._layout.last_cells(pegs)
+        return not pegs & self._last_cells[1]
+
+
+class _Layout:
+    """
+    Tables shared by every GridPegSolitairePuzzle on the same board shape.
+    """
+
+    def __init__(self, height, width, unused):
+        """
+        Create the tables for a height x width board whose "#" cells
+        are the bits set in unused.
+
+        @type self: _Layout
+        @type height: int
+        @type width: int
+        @type unused: int
+        @rtype: None
+        """
+        self.height, self.width, self.unused = height, width, unused
+        # (start and middle cells, landing cell, all three cells)
+        # for every jump whose three cells are on the board
+        self.jumps = []
+        for row in range(height):
+            for column in range(width):
+                for d_row, d_column in ((0, 1), (1, 0)):
+                    end_row, end_column = row + 2 * d_row, column + 2 * d_column
+                    if end_row >= height or end_column >= width:
+                        continue
+                    first = 1 << (row * width + column)
+                    middle = 1 << ((row + d_row) * width + column + d_column)
+                    last = 1 << (end_row * width + end_column)
+                    cells = first | middle | last
+                    if cells & unused:
+                        continue
+                    self.jumps.append((first | middle, last, cells))
+                    self.jumps.append((last | middle, first, cells))
+        board = ((1 << (height * width)) - 1) & ~unused
+        # the board cells of each class (row + column) % 3, then of each
+        # class (row - column) % 3
+        self.diagonals = [[sum([1 << (r * width + c)
+                                for r in range(height)
+                                for c in range(width)
+                                if (r + sign * c) % 3 == k]) & board
+                           for k in range(3)]
+                          for sign in (1, -1)]
+        # for each pair of classes (k, l): the board cells in both, and a
+        # set of cells, including those, that no jump can land in
+        # without starting or jumping over one of them
+        self.finishes = {}
+        for k in range(3):
+            for l in range(3):
+                targets = self.diagonals[0][k] & self.diagonals[1][l]
+                pagoda, grown = targets, True
+                while grown:
+                    grown = False
+                    for first_middle, last, cells in self.jumps:
+                        if last & pagoda and not first_middle & pagoda:
+                            pagoda |= _middle(cells)
+                            grown = True
+                self.finishes[(k, l)] = (targets, pagoda)
+        # for each rotation or reflection, other than doing nothing, that
+        # keeps the "#" cells in place: tables giving the image of each
+        # possible byte of a peg bitmask, one table per byte
+        self.symmetries = []
+        cells = height * width
+        for mapping in _symmetries(height, width):
+            if _mapped(unused, mapping) != unused:
+                continue
+            self.symmetries.append(
+                [[_mapped(value << (8 * chunk), mapping)
+                  for value in range(256)]
+                 for chunk in range((cells + 7) // 8)])
+        # images packs the bitmasks in fields of 64 bits, which smallest
+        # unpacks all at once, or as wide as the board if it is larger
+        count = len(self.symmetries) + 1
+        self._field, self._mask = max(64, cells), (1 << cells) - 1
+        self._shifts = range(0, self._field * count, self._field)
+        self._unpack, self._size = None, 8 * count
+        if cells <= 64:
+            self._unpack = struct.Struct("<{}Q".format(count)).unpack
+        # the packed images of the three cells of each jump
+        self.jump_images = {jump[2]: self.images(jump[2])
+                            for jump in self.jumps}
+        # a random number for each cell, seeded by the shape of the
+        # board so hashes agree between processes, and the exclusive or
+        # of those of the three cells of each jump
+        rng = random.Random("{}x{}".format(height, width))
+        self.zobrist = [rng.getrandbits(64) for _ in range(cells)]
+        self.jump_hashes = {jump[2]: self.hash(jump[2])
+                            for jump in self.jumps}
+
+    def images(self, pegs):
+        """
+        Return the bitmask pegs and its images under each rotation or
+        reflection in symmetries, packed into one int, each in its own
+        field of 64 bits, or as wide as the board if it is larger.  The
+        packed images of a board after a jump are then those before,
+        exclusive-or those of the jump's three cells.
+
+        @type self: _Layout
+        @type pegs: int
+        @rtype: int
+
+        >>> layout = _layout([["*", "*", "."]])
+        >>> [layout.smallest(layout.images(pegs)) for pegs in (0b011, 0b110)]
+        [3, 3]
+        >>> layout.images(0b011) ^ layout.jump_images[0b111] == (
+        ...     layout.images(0b100))
+        True
+        """
+        packed, shift = pegs, self._field
+        for tables in self.symmetries:
+            image, rest, chunk = 0, pegs, 0
+            while rest:
+                image |= tables[chunk][rest & 255]
+                rest >>= 8
+                chunk += 1
+            packed |= image << shift
+            shift += self._field
+        return packed
+
+    def smallest(self, packed):
+        """
+        Return the smallest of the bitmasks packed by images.
+
+        @type self: _Layout
+        @type packed: int
+        @rtype: int
+        """
+        if self._unpack is not None:
+            return min(self._unpack(packed.to_bytes(self._size, "little")))
+        mask = self._mask
+        return min([(packed >> shift) & mask for shift in self._shifts])
+
+    def hash(self, pegs):
+        """
+        Return the Zobrist hash of the bitmask pegs, as
+        GridPegSolitairePuzzle.state_hash gives it.
+
+        @type self: _Layout
+        @type pegs: int
+        @rtype: int
+        """
+        h, zobrist = 0, self.zobrist
+        while pegs:
+            bit = pegs & -pegs
+            h ^= zobrist[bit.bit_length() - 1]
+            pegs ^= bit
+        return h
+
+    def last_cells(self, pegs):
+        """
+        Return a bitmask of the cells where the last of pegs could be
+        left, all in one class (row + column) % 3 and one class
+        (row - column) % 3, and the pagoda set of cells for them; both
+        are 0 if pegs can never be reduced to one.
+
+        @type self: _Layout
+        @type pegs: int
+        @rtype: (int, int)
+
+        >>> layout = _layout([["*", "*", "*", "*"]])
+        >>> layout.last_cells(0b0011), layout.last_cells(0b1001)
+        ((4, 6), (0, 0))
+        """
+        classes = []
+        for diagonals in self.diagonals:
+            odd = [bin(pegs & cells).count("1") % 2 for cells in diagonals]
+            if odd[0] == odd[1] == odd[2]:
+                return 0, 0
+            # the class whose parity differs from those of the others
+            classes.append([k for k in range(3)
+                            if odd[k] != odd[(k + 1) % 3] and
+                            odd[k] != odd[(k + 2) % 3]][0])
+        return self.finishes[(classes[0], classes[1])]
+
+
+# layouts already built, by (height, width, unused)
+_LAYOUTS = {}
+
+
+def _layout(marker):
+    # Return the _Layout for the shape of marker, building it only
+    # the first time that shape is seen.
+    #
+    # @type marker: list[list[str]]
+    # @rtype: _Layout
+    shape = (len(marker), len(marker[0]), _cells_marked(marker, "#"))
+    if shape not in _LAYOUTS:
+        _LAYOUTS[shape] = _Layout(*shape)
+    return _LAYOUTS[shape]
+
+
+def _symmetries(height, width):
+    # Return, for each rotation and reflection of a height x width board
+    # other than doing nothing, the list giving the cell each cell goes
+    # to; cells are numbered row * width + column.
+    #
+    # @type height: int
+    # @type width: int
+    # @rtype: list[list[int]]
+    h, w = height - 1, width - 1
+    moves = [lambda r, c: (r, w - c), lambda r, c: (h - r, c),
+             lambda r, c: (h - r, w - c)]
+    if height == width:
+        moves += [lambda r, c: (c, r), lambda r, c: (w - c, h - r),
+                  lambda r, c: (c, h - r), lambda r, c: (w - c, r)]
+    mappings = []
+    for move in moves:
+        mappings.append([])
+        for row in range(height):
+            for column in range(width):
+                new_row, new_column = move(row, column)
+                mappings[-1].append(new_row * width + new_column)
+    return mappings
+
+
+def _mapped(mask, mapping):
+    # Return the bitmask with bit mapping[i] set for each bit i of mask.
+    #
+    # @type mask: int
+    # @type mapping: list[int]
+    # @rtype: int
+    image, i = 0, 0
+    while mask and i < len(mapping):
+        if mask & 1:
+            image |= 1 << mapping[i]
+        mask >>= 1
+        i += 1
+    return image
+
+
+def _middle(cells):
+    # Return the bit of the middle one of the three cells of a jump, the
+    # bits in cells; cells in a line are numbered in order along it.
+    #
+    # @type cells: int
+    # @rtype: int
+    return cells & ~(cells & -cells) & ~(1 << (cells.bit_length() - 1))
+
+
+def _cells_marked(marker, symbol):
+    # Return a bitmask with bit (row * width + column) set iff that
+    # cell of marker holds symbol.
+    #
+    # @type marker: list[list[str]]
+    # @type symbol: str
+    # @rtype: int
+    mask, bit = 0, 1
+    for row in marker:
+        for cell in row:
+            if cell == symbol:
+                mask |= bit
+            bit <<= 1
+    return mask
+
 
 if __name__ == "__main__":
     import doctest
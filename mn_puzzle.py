@@ -1,4 +1,6 @@
 from puzzle import Puzzle
+import bisect
+import random
 
 class MNPuzzle(Puzzle):
     """
@@ -22,7 +24,57 @@ class MNPuzzle(Puzzle):
         assert all([len(r) == len(from_grid[0]) for r in from_grid])
         assert all([len(r) == len(to_grid[0]) for r in to_grid])
         self.n, self.m = len(from_grid), len(from_grid[0])
-        self.from_grid, self.to_grid = from_grid, to_grid
+        self.to_grid = to_grid
+        # the grid is kept flat, each tile replaced by its index in to_grid,
+        # in a buffer that moves change in place
+        self._layout = _layout(to_grid)
+        assert (self.n, self.m) == (self._layout.n, self._layout.m)
+        assert (sorted(t for row in from_grid for t in row) ==
+                sorted(self._layout.names))
+        ids = self._layout.ids
+        self._tiles = self._layout.buffer(
+            [ids[t] for row in from_grid for t in row])
+        self._blank = self._tiles.index(self._layout.blank)
+        # Zobrist hash of the tiles, updated by every move
+        self._hash = self._layout.hash(self._tiles)
+        # whether to_grid can be reached at all, found by fail_fast; every
+        # move keeps the answer, so extensions inherit it
+        self._solvable = None
+
+    @classmethod
+    def _from_tiles(cls, tiles, blank, layout, to_grid, solvable, h):
+        # Return a new MNPuzzle with flat tiles, the "*" at index blank
+        # and Zobrist hash h, skipping the checks and conversion done by
+        # __init__.
+        #
+        # @type tiles: bytearray | list[int]
+        # @type blank: int
+        # @type layout: _Layout
+        # @type to_grid: tuple[tuple[str]]
+        # @type solvable: bool | None
+        # @type h: int
+        # @rtype: MNPuzzle
+        puzzle = cls.__new__(cls)
+        puzzle.n, puzzle.m, puzzle.to_grid = layout.n, layout.m, to_grid
+        puzzle._layout, puzzle._tiles, puzzle._blank = layout, tiles, blank
+        puzzle._solvable, puzzle._hash = solvable, h
+        return puzzle
+
+    @property
+    def from_grid(self):
+        """
+        The current configuration of MNPuzzle self, as rows of tiles.
+
+        @type self: MNPuzzle
+        @rtype: tuple[tuple[str]]
+
+        >>> m1 = MNPuzzle((("*", "2"), ("1", "3")), (("1", "2"), ("3", "*")))
+        >>> m1.from_grid
+        (('*', '2'), ('1', '3'))
+        """
+        names, m = self._layout.names, self.m
+        tiles = [names[t] for t in self._tiles]
+        return tuple(tuple(tiles[r * m:(r + 1) * m]) for r in range(self.n))
 
     def __eq__(self, other):
         """
@@ -46,8 +98,64 @@ class MNPuzzle(Puzzle):
         """
 
         return (type(self) == type(other) and
-                self.from_grid == other.from_grid and
-                self.to_grid == other.to_grid)
+                self.to_grid == other.to_grid and
+                self._tiles == other._tiles)
+
+    __hash__ = Puzzle.__hash__
+
+    def __reduce__(self):
+        """
+        Return how to rebuild MNPuzzle self when it is unpickled, such as
+        when sent to or from a worker process.  Only the current and goal
+        grids are sent; the move and Zobrist tables for to_grid are
+        rebuilt, or reused if the receiving process already has them.
+
+        @type self: MNPuzzle
+        @rtype: tuple
+        """
+        return MNPuzzle, (self.from_grid, self.to_grid)
+
+    def state_key(self):
+        """
+        Return the tiles of MNPuzzle self's current grid, read row by row,
+        each given by its index in to_grid read the same way.
+
+        @type self: MNPuzzle
+        @rtype: bytes | tuple[int]
+
+        >>> m = MNPuzzle((("*", "2"), ("1", "3")), (("1", "2"), ("3", "*")))
+        >>> m.state_key()
+        b'\\x03\\x01\\x00\\x02'
+        """
+        return self._layout.pack(self._tiles)
+
+    def state_hash(self):
+        """
+        Return the Zobrist hash of MNPuzzle self's current grid: the
+        exclusive or of a fixed random number for each tile other than
+        the "*" at its index, kept up to date by apply and undo.
+
+        @type self: MNPuzzle
+        @rtype: int
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> m = MNPuzzle((("*", "2", "3"), ("1", "4", "5")), target_grid)
+        >>> m.apply((0, 3))
+        >>> m.state_hash() == MNPuzzle(m.from_grid, target_grid).state_hash()
+        True
+        """
+        return self._hash
+
+    def __copy__(self):
+        """
+        Return a copy of MNPuzzle self that can be changed independently.
+
+        @type self: MNPuzzle
+        @rtype: MNPuzzle
+        """
+        return MNPuzzle._from_tiles(self._layout.buffer(self._tiles),
+                                    self._blank, self._layout, self.to_grid,
+                                    self._solvable, self._hash)
 
     def __str__(self):
         """
@@ -94,137 +202,63 @@ class MNPuzzle(Puzzle):
         >>> MN2 in MN1
         True
         """
-        # convenient names
-        from_grid, to_grid = self.from_grid, self.to_grid
-        #find the "*" coordinate from the from_grid
-        count_row = 0
-        for row in from_grid:
-            count_column = 0
-            for column in row:
-                if column == "*":
-                    r = count_row
-                    c = count_column    # empty space in (x, y)
-                count_column += 1
-            count_row += 1
-
-        # helper functions
-        def swap_up(self):
-            """
-            Return object of up movement extension of MNPuzzle self.
-
-            @type self: MNPuzzle
-            @rtype: MNPuzzle
-
-            """
-            temp_cell = from_grid[r-1][c]  # Assigning the temporary cel
-            working_grid = []
-            for elements in from_grid:
-                working_grid.append(list(elements)) # change it to list format
-            if r == 0:    # row is 0, can't move up
-                return None
-            else:
-                working_grid[r][c] = temp_cell
-                working_grid[r-1][c] = "*"  # place the "*" towards up
-
-            new_grid = []
-            for elements in working_grid:
-                new_grid.append(tuple(elements))
-            new_grid = tuple(new_grid)  # return in tuple format
-
-            return MNPuzzle(new_grid, to_grid)
-
-        def swap_down(self):
-            """
-            Return object of down movement extension of MNPuzzle self.
-
-            @type self: MNPuzzle
-            @rtype: MNPuzzle
-
-            """
-
-            # can't move down if it is all thw way down
-            if r == len(from_grid)-1:
-                return None
-            temp_cell = from_grid[r+1][c] # Assigning the temporary cell
-            working_grid=[]
-            for elements in from_grid:
-                working_grid.append(list(elements))
-            else:
-                working_grid[r][c] = temp_cell
-                working_grid[r+1][c] = "*"  # place the "*" towards down
-
-            new_grid = []
-            for elements in working_grid:
-                new_grid.append(tuple(elements))
-            new_grid = tuple(new_grid)
-
-            return MNPuzzle(new_grid, to_grid)
-
-        def swap_left(self):
-            """
-            Return object of left movement extension of MNPuzzle self.
-
-            @type self: MNPuzzle
-            @rtype: object
-
-            """
-
-            temp_cell = from_grid[r][c-1] # Assigning the temporary cell
-            working_grid=[]
-            for elements in from_grid:
-                working_grid.append(list(elements))
-            if c == 0: # cant move left, if column is  0
-                return None
-            else:
-                working_grid[r][c] = temp_cell
-                working_grid[r][c-1] = "*"  # place the "*" towards left
-
-            new_grid = []
-            for elements in working_grid:
-                new_grid.append(tuple(elements))
-            new_grid = tuple(new_grid)
-
-            return MNPuzzle(new_grid, to_grid)
-
-        def swap_right(self):
-            """
-            Return object of right movement extension of MNPuzzle self.
-
-            @type self: MNPuzzle
-            @rtype: object
-
-            """
-
-            if c == len(from_grid[0])-1:  # can't move right, if is all thw way right
-                return None
-            temp_cell = from_grid[r][c+1]  # Assigning the temporary cell
-            working_grid=[]
-            for elements in from_grid:
-                working_grid.append(list(elements))
-            else:
-                working_grid[r][c] = temp_cell
-                working_grid[r][c+1] = "*"  # place the "*" towards right
-
-            new_grid = []
-            for elements in working_grid:
-                new_grid.append(tuple(elements))
-            new_grid = tuple(new_grid)
-
-            return MNPuzzle(new_grid, to_grid)
-
-        # appends all the moves in final list
-        final_list = []
-        final_list.append(swap_up(self))
-        final_list.append(swap_down(self))
-        final_list.append(swap_left(self))
-        final_list.append(swap_right(self))
-        # If any extension is None, it removes it and return the possible one in the final list
-        while True:
-            if None in final_list:
-                final_list.remove(None)
-            else:
-                break
-        return final_list
+        return Puzzle.extensions(self)
+
+    def moves(self):
+        """
+        Return list of the moves that can be applied to MNPuzzle self,
+        each a pair (index of "*", index of the tile it swaps with),
+        indices counting row by row: up, down, left, right.
+
+        @type self: MNPuzzle
+        @rtype: list[(int, int)]
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> MNPuzzle((("*", "2", "3"), ("1", "4", "5")), target_grid).moves()
+        ((0, 3), (0, 1))
+        """
+        return self._layout.moves[self._blank]
+
+    def apply(self, move):
+        """
+        Swap the "*" of MNPuzzle self with a neighbouring tile, in place.
+
+        @type self: MNPuzzle
+        @type move: (int, int)
+        @rtype: None
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> m = MNPuzzle((("*", "2", "3"), ("1", "4", "5")), target_grid)
+        >>> m.apply((0, 3))
+        >>> print(m)
+        1 |2 |3 |
+        * |4 |5 |
+        >>> m.undo((0, 3))
+        >>> print(m)
+        * |2 |3 |
+        1 |4 |5 |
+        """
+        blank, target = move
+        tiles, zobrist = self._tiles, self._layout.zobrist
+        tile = tiles[target]
+        tiles[blank], tiles[target] = tile, tiles[blank]
+        self._blank = target
+        self._hash ^= zobrist[blank][tile] ^ zobrist[target][tile]
+
+    def undo(self, move):
+        """
+        Swap the "*" of MNPuzzle self back to where it was before move.
+
+        @type self: MNPuzzle
+        @type move: (int, int)
+        @rtype: None
+        """
+        blank, target = move
+        tiles, zobrist = self._tiles, self._layout.zobrist
+        tile = tiles[blank]
+        tiles[blank], tiles[target] = tiles[target], tile
+        self._blank = blank
+        self._hash ^= zobrist[blank][tile] ^ zobrist[target][tile]
 
     def is_solved(self):
         """
@@ -244,9 +278,267 @@ class MNPuzzle(Puzzle):
         >>> m2.is_solved()
         False
         """
-        # convenient names
-        from_grid, to_grid = self.from_grid, self.to_grid
-        return from_grid == to_grid
+        return self._tiles == self._layout.solved
+
+    def fail_fast(self):
+        """
+        Return True iff MNPuzzle self can never reach to_grid.
+
+        Each move is a swap, so it flips the parity of the permutation
+        taking from_grid to to_grid and also of the distance between
+        their "*"s; only grids where the two parities agree are solvable.
+        On a single row or column, the tiles can't pass each other at all.
+        The answer is worked out once and passed on to extensions.
+
+        @type self: MNPuzzle
+        @rtype: bool
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> MNPuzzle((("*", "2", "3"), ("1", "4", "5")), target_grid).fail_fast()
+        False
+        >>> MNPuzzle((("2", "1", "3"), ("4", "5", "*")), target_grid).fail_fast()
+        True
+        >>> MNPuzzle((("2", "*", "1"),), (("1", "2", "*"),)).fail_fast()
+        True
+        """
+        if self._solvable is None:
+            self._solvable = _solvable(self._tiles, self._blank, self._layout)
+        return not self._solvable
+
+    def goal_state(self):
+        """
+        Return the solved MNPuzzle that self works towards.
+
+        @type self: MNPuzzle
+        @rtype: MNPuzzle
+
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> print(MNPuzzle(start_grid, target_grid).goal_state())
+        1 |2 |3 |
+        4 |5 |* |
+        """
+        layout = self._layout
+        return MNPuzzle._from_tiles(layout.buffer(layout.solved),
+                                    layout.blank, layout, self.to_grid, True,
+                                    layout.hash(layout.solved))
+
+    def reverse_extensions(self):
+        """
+        Return list of MNPuzzles that have self as an extension.  Every
+        move can be undone, so these are just the extensions of self.
+
+        @type self: MNPuzzle
+        @rtype: list[MNPuzzle]
+
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> m = MNPuzzle(start_grid, target_grid)
+        >>> m.reverse_extensions() == m.extensions()
+        True
+        """
+        return self.extensions()
+
+    def heuristic(self):
+        """
+        Return a lower bound on the number of moves needed to solve
+        MNPuzzle self: its Manhattan distance plus its linear conflicts.
+
+        @type self: MNPuzzle
+        @rtype: int
+
+        >>> start_grid = (("2", "1", "3"), ("4", "5", "*"))
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> MNPuzzle(start_grid, target_grid).heuristic()
+        4
+        """
+        return self.manhattan_distance() + self.linear_conflict()
+
+    def tile_positions(self):
+        """
+        Return a list giving, for the tile at each index of to_grid read
+        row by row, that tile's index in MNPuzzle self's current grid.
+
+        @type self: MNPuzzle
+        @rtype: list[int]
+
+        >>> m = MNPuzzle((("*", "2"), ("1", "3")), (("1", "2"), ("3", "*")))
+        >>> m.tile_positions()
+        [2, 1, 3, 0]
+        """
+        positions = [0] * len(self._tiles)
+        for position, tile in enumerate(self._tiles):
+            positions[tile] = position
+        return positions
+
+    def manhattan_distance(self):
+        """
+        Return the total number of rows and columns separating each tile
+        of MNPuzzle self from its place in to_grid.  The "*" is ignored.
+
+        @type self: MNPuzzle
+        @rtype: int
+
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> MNPuzzle(start_grid, target_grid).manhattan_distance()
+        3
+        """
+        m, blank = self.m, self._layout.blank
+        total = 0
+        for position, tile in enumerate(self._tiles):
+            if tile != blank:
+                total += (abs(position // m - tile // m) +
+                          abs(position % m - tile % m))
+        return total
+
+    def linear_conflict(self):
+        """
+        Return the extra moves forced by linear conflicts in MNPuzzle self.
+
+        Two tiles are in linear conflict when both are in their goal row
+        (or column) but in the reverse order; one of them must leave the
+        line and come back, costing 2 moves beyond the Manhattan distance.
+
+        @type self: MNPuzzle
+        @rtype: int
+
+        >>> start_grid = (("2", "1", "3"), ("4", "5", "*"))
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> MNPuzzle(start_grid, target_grid).linear_conflict()
+        2
+        """
+        n, m, tiles, blank = self.n, self.m, self._tiles, self._layout.blank
+        total = 0
+        for row in range(n):
+            line = tiles[row * m:(row + 1) * m]
+            total += _line_conflict(
+                [t % m for t in line if t != blank and t // m == row])
+        for column in range(m):
+            line = tiles[column::m]
+            total += _line_conflict(
+                [t // m for t in line if t != blank and t % m == column])
+        return total
+
+
+class _Layout:
+    """
+    Tables shared by every MNPuzzle working towards the same to_grid.
+    """
+
+    def __init__(self, to_grid):
+        """
+        Create the tables for puzzles working towards to_grid.
+
+        @type self: _Layout
+        @type to_grid: tuple[tuple[str]]
+        @rtype: None
+        """
+        n, m = len(to_grid), len(to_grid[0])
+        self.n, self.m = n, m
+        # tile name at each index of the flattened to_grid, and back
+        self.names = tuple(t for row in to_grid for t in row)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        assert len(self.ids) == n * m and "*" in self.ids
+        self.blank = self.ids["*"]
+        # grids of up to 256 cells are kept in bytearrays and packed into
+        # bytes for keys; larger ones in lists, packed into tuples
+        if n * m <= 256:
+            self.pack, self.buffer = bytes, bytearray
+        else:
+            self.pack, self.buffer = tuple, list
+        self.solved = self.buffer(range(n * m))
+        # indices the "*" can move to from each index: up, down, left, right
+        self.neighbours = tuple(
+            tuple(j for j, legal in ((i - m, i >= m),
+                                     (i + m, i < (n - 1) * m),
+                                     (i - 1, i % m > 0),
+                                     (i + 1, i % m < m - 1)) if legal)
+            for i in range(n * m))
+        # moves of the "*" from each index, as MNPuzzle.moves gives them
+        self.moves = tuple(tuple((i, j) for j in self.neighbours[i])
+                           for i in range(n * m))
+        # a random number for each tile at each index, 0 for the "*" as
+        # the other tiles fix where it is; seeded by the size of the grid
+        # so hashes agree between processes
+        rng = random.Random("{}x{}".format(n, m))
+        self.zobrist = tuple(
+            tuple(0 if t == self.blank else rng.getrandbits(64)
+                  for t in range(n * m))
+            for _ in range(n * m))
+
+    def hash(self, tiles):
+        """
+        Return the Zobrist hash of flat tiles, as MNPuzzle.state_hash
+        gives it.
+
+        @type self: _Layout
+        @type tiles: bytearray | list[int]
+        @rtype: int
+        """
+        h = 0
+        for i, t in enumerate(tiles):
+            h ^= self.zobrist[i][t]
+        return h
+
+
+# layouts already built, by to_grid
+_LAYOUTS = {}
+
+
+def _layout(to_grid):
+    # Return the _Layout for to_grid, building it only the first time
+    # to_grid is seen.
+    #
+    # @type to_grid: tuple[tuple[str]]
+    # @rtype: _Layout
+    if to_grid not in _LAYOUTS:
+        _LAYOUTS[to_grid] = _Layout(to_grid)
+    return _LAYOUTS[to_grid]
+
+
+def _solvable(tiles, blank, layout):
+    # Return whether flat tiles, with the "*" at index blank, can be
+    # rearranged into layout's to_grid.  Parity is found by counting
+    # cycles, in O(n * m) rather than by counting inversions.
+    #
+    # @type tiles: bytearray | list[int]
+    # @type blank: int
+    # @type layout: _Layout
+    # @rtype: bool
+    if layout.n == 1 or layout.m == 1:
+        return ([t for t in tiles if t != layout.blank] ==
+                [t for t in layout.solved if t != layout.blank])
+    # tiles is a permutation sending each index to the index its tile
+    # has in to_grid; it is even iff length minus cycle count is even
+    seen, cycles = [False] * len(tiles), 0
+    for i in range(len(tiles)):
+        if not seen[i]:
+            cycles += 1
+            while not seen[i]:
+                seen[i], i = True, tiles[i]
+    m, goal = layout.m, layout.blank
+    distance = abs(blank // m - goal // m) + abs(blank % m - goal % m)
+    return (len(tiles) - cycles) % 2 == distance % 2
+
+
+def _line_conflict(goals):
+    # Return the linear-conflict cost of one row or column, given the
+    # goal positions along that line of the tiles that belong in it,
+    # in the order the tiles currently appear.  Tiles outside a longest
+    # increasing run of goals must each leave the line and come back,
+    # 2 moves each, and no fewer tiles can.
+    #
+    # @type goals: list[int]
+    # @rtype: int
+    tails = []
+    for g in goals:
+        k = bisect.bisect_left(tails, g)
+        if k == len(tails):
+            tails.append(g)
+        else:
+            tails[k] = g
+    return 2 * (len(goals) - len(tails))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,243 @@
+"""
+Additive pattern databases for MNPuzzle: tables, built once and kept on
+disk, of the fewest moves of a chosen group of tiles needed to bring
+those tiles home, whatever the other tiles do.
+
+A database file is one header line followed by one byte per placement
+of the group's tiles.  Files are memory-mapped when opened, so lookups
+read straight from the page cache and worker processes share one copy.
+"""
+from collections import deque
+import mmap
+
+# first word of the header line of every database file
+_MAGIC = b"MNPDB1"
+
+
+def build_pattern_database(to_grid, tiles, path):
+    """
+    Write to path a pattern database for MNPuzzles working towards
+    to_grid, covering the group of tiles.
+
+    Each entry is the fewest moves of tiles in the group needed to take
+    them from some placement to their places in to_grid; moves of other
+    tiles are free.  Entries are found by breadth-first search backwards
+    from to_grid, tracking only the group's tiles and the "*".  Databases
+    for disjoint groups may be added together and still never
+    overestimate the moves needed, e.g. a 6-6-3 split of the 15-puzzle.
+
+    @type to_grid: tuple[tuple[str]]
+    @type tiles: list[str]
+    @type path: str
+    @rtype: None
+    """
+    n, m = len(to_grid), len(to_grid[0])
+    names = [t for row in to_grid for t in row]
+    cells, ids = len(names), [names.index(t) for t in tiles]
+    assert "*" not in tiles and len(set(ids)) == len(ids)
+    # indices next to each index: up, down, left, right
+    neighbours = [[j for j, legal in ((i - m, i >= m),
+                                      (i + m, i < (n - 1) * m),
+                                      (i - 1, i % m > 0),
+                                      (i + 1, i % m < m - 1)) if legal]
+                  for i in range(cells)]
+    table = bytearray(b"\xff") * _placements(cells, len(ids))
+    # each state is (positions of the group's tiles, position of "*"),
+    # and its best cost so far is kept at index rank * cells + position;
+    # moving "*" onto a tile of the group costs 1, anything else 0
+    best = bytearray(b"\xff") * (len(table) * cells)
+    start = (tuple(ids), names.index("*"))
+    best[_rank(start[0], cells) * cells + start[1]] = 0
+    queue = deque([start])
+    while queue:
+        positions, blank = queue.popleft()
+        index = _rank(positions, cells)
+        cost = best[index * cells + blank]
+        if cost < table[index]:
+            table[index] = cost
+        for target in neighbours[blank]:
+            if target in positions:
+                moved = tuple(blank if p == target else p for p in positions)
+                moved_index, step = _rank(moved, cells), 1
+            else:
+                moved, moved_index, step = positions, index, 0
+            slot = moved_index * cells + target
+            if best[slot] > cost + step:
+                best[slot] = cost + step
+                if step:
+                    queue.append((moved, target))
+                else:
+                    queue.appendleft((moved, target))
+    header = b" ".join([_MAGIC, str(n).encode(), str(m).encode(),
+                        ",".join(names).encode(),
+                        ",".join(map(str, ids)).encode()])
+    with open(path, "wb") as f:
+        f.write(header + b"\n")
+        f.write(table)
+
+
+class PatternDatabase:
+    """
+    A pattern database file, memory-mapped for reading.
+    """
+
+    def __init__(self, path):
+        """
+        Open the pattern database written to path by
+        build_pattern_database.
+
+        @type self: PatternDatabase
+        @type path: str
+        @rtype: None
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._start = self._map.find(b"\n") + 1
+        magic, n, m, names, ids = self._map[:self._start - 1].split(b" ")
+        assert magic == _MAGIC
+        n, m, names = int(n), int(m), names.decode().split(",")
+        self.to_grid = tuple(tuple(names[r * m:(r + 1) * m])
+                             for r in range(n))
+        self._ids = [int(i) for i in ids.split(b",")]
+        self._cells = n * m
+        # the last to_grid of a puzzle found to equal self.to_grid, so
+        # that puzzles sharing it are checked once
+        self._checked = self.to_grid
+
+    def __reduce__(self):
+        """
+        Return how to rebuild PatternDatabase self when it is unpickled:
+        by mapping the same file again, not by copying its contents.
+
+        @type self: PatternDatabase
+        @rtype: tuple
+        """
+        return PatternDatabase, (self.path,)
+
+    def lookup(self, puzzle, positions=None):
+        """
+        Return the fewest moves of this database's tiles needed to bring
+        them home from where they are in puzzle, which must work towards
+        the to_grid the database was built for.  positions, if given,
+        are puzzle.tile_positions(), found once for several lookups.
+
+        @type self: PatternDatabase
+        @type puzzle: MNPuzzle
+        @type positions: list[int] | None
+        @rtype: int
+        """
+        if puzzle.to_grid is not self._checked:
+            assert puzzle.to_grid == self.to_grid, (
+                "{} was built for another to_grid".format(self.path))
+            self._checked = puzzle.to_grid
+        if positions is None:
+            positions = puzzle.tile_positions()
+        index = _rank([positions[i] for i in self._ids], self._cells)
+        return self._map[self._start + index]
+
+    def close(self):
+        """
+        Unmap the file of PatternDatabase self.
+
+        @type self: PatternDatabase
+        @rtype: None
+        """
+        self._map.close()
+
+
+class PatternDatabaseHeuristic:
+    """
+    A heuristic for astar_solve and ida_star_solve adding up pattern
+    databases built for disjoint groups of tiles.
+    """
+
+    def __init__(self, paths):
+        """
+        Create a new PatternDatabaseHeuristic self from the pattern
+        database files at paths, all built for the same to_grid.
+
+        @type self: PatternDatabaseHeuristic
+        @type paths: list[str]
+        @rtype: None
+        """
+        self.databases = [PatternDatabase(path) for path in paths]
+        assert len(set(db.to_grid for db in self.databases)) <= 1
+
+    def __call__(self, puzzle):
+        """
+        Return the sum of the entries for puzzle in each database of
+        PatternDatabaseHeuristic self.
+
+        @type self: PatternDatabaseHeuristic
+        @type puzzle: MNPuzzle
+        @rtype: int
+
+        >>> import os, tempfile
+        >>> from mn_puzzle import MNPuzzle
+        >>> from puzzle_tools import astar_solve
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> folder = tempfile.mkdtemp()
+        >>> paths = [os.path.join(folder, "a"), os.path.join(folder, "b")]
+        >>> build_pattern_database(target_grid, ["1", "2", "3"], paths[0])
+        >>> build_pattern_database(target_grid, ["4", "5"], paths[1])
+        >>> h = PatternDatabaseHeuristic(paths)
+        >>> start = MNPuzzle((("*", "2", "3"), ("1", "4", "5")), target_grid)
+        >>> h(start)
+        3
+        >>> astar_solve(start, h) is None
+        False
+        >>> other_grid = (("1", "2", "3"), ("4", "*", "5"))
+        >>> other = MNPuzzle((("*", "2", "3"), ("1", "4", "5")), other_grid)
+        >>> h(other)  # doctest: +ELLIPSIS
+        Traceback (most recent call last):
+        ...
+        AssertionError: ... was built for another to_grid
+        """
+        positions = puzzle.tile_positions()
+        return sum([db.lookup(puzzle, positions) for db in self.databases])
+
+
+def _placements(cells, k):
+    # Return the number of ways to put k distinct tiles in cells places.
+    #
+    # @type cells: int
+    # @type k: int
+    # @rtype: int
+    count = 1
+    for i in range(k):
+        count *= cells - i
+    return count
+
+
+def _rank(positions, cells):
+    # Return the index, from 0 to _placements(cells, len(positions)) - 1,
+    # of positions among all placements of that many distinct tiles.
+    #
+    # @type positions: list[int] | tuple[int]
+    # @type cells: int
+    # @rtype: int
+    index, used = 0, 0
+    for k, p in enumerate(positions):
+        # places before p not yet taken by an earlier tile
+        free_before = p - bin(used & ((1 << p) - 1)).count("1")
+        index = index * (cells - k) + free_before
+        used |= 1 << p
+    return index
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Build a pattern database for the n x m puzzle whose "
+                    "goal has tiles 1, 2, ... in order and \"*\" last.")
+    parser.add_argument("n", type=int)
+    parser.add_argument("m", type=int)
+    parser.add_argument("path")
+    parser.add_argument("tiles", nargs="+")
+    args = parser.parse_args()
+    labels = [str(i) for i in range(1, args.n * args.m)] + ["*"]
+    goal_grid = tuple(tuple(labels[r * args.m:(r + 1) * args.m])
+                      for r in range(args.n))
+    build_pattern_database(goal_grid, args.tiles, args.path)
@@ -1,3 +1,6 @@
+import copy
+
+
 class Puzzle:
     """"
     Snapshot of a full-information puzzle, which may be solved, unsolved,
@@ -32,10 +35,146 @@ class Puzzle:
         """
         Return list of legal extensions of Puzzle self.
 
-        This is an abstract method that must be implemented
-        in a subclass.
+        Either override this in a subclass, or implement moves, apply
+        and __copy__ there: by default each extension is a copy of self
+        with one of its moves applied.
 
         @type self: Puzzle
         @rtype: list[Puzzle]
         """
+        extensions = []
+        for move in self.moves():
+            extension = copy.copy(self)
+            extension.apply(move)
+            extensions.append(extension)
+        return extensions
+
+    def moves(self):
+        """
+        Return list of the moves that can be applied to Puzzle self,
+        one for each legal extension.
+
+        Together with apply and undo, this lets a search change a single
+        Puzzle in place and change it back, rather than build a new
+        Puzzle for every extension.  This is an optional method, to be
+        implemented in a subclass along with apply and undo.
+
+        @type self: Puzzle
+        @rtype: list[object]
+        """
+        raise NotImplementedError
+
+    def apply(self, move):
+        """
+        Change Puzzle self, in place, by move, one of self.moves().
+
+        @type self: Puzzle
+        @type move: object
+        @rtype: None
+        """
+        raise NotImplementedError
+
+    def undo(self, move):
+        """
+        Change Puzzle self, in place, back to what it was before move
+        was applied to it.
+
+        @type self: Puzzle
+        @type move: object
+        @rtype: None
+        """
         raise NotImplementedError
+
+    def state_key(self):
+        """
+        Return a compact hashable key for the configuration of Puzzle self.
+
+        Two configurations met during the same search have equal keys
+        iff they are the same configuration, so search tools use the key
+        to recognise configurations already seen.  Override this in a
+        subclass with something cheaper than the string representation.
+
+        @type self: Puzzle
+        @rtype: object
+        """
+        return str(self)
+
+    def state_hash(self):
+        """
+        Return a 64-bit hash of the configuration of Puzzle self, equal
+        for configurations with equal state_keys.
+
+        Unlike state_key, different configurations may, very rarely, have
+        the same hash, so it stands in for the key only where a search
+        already accepts that, as a HashedTranspositionTable does.
+        Override this in a subclass that can keep the hash up to date as
+        moves are applied, rather than hashing the whole key each time.
+
+        @type self: Puzzle
+        @rtype: int
+        """
+        return hash(self.state_key()) & 0xFFFFFFFFFFFFFFFF
+
+    def __hash__(self):
+        """
+        Return a hash of Puzzle self, consistent with its state_key.
+
+        A subclass that overrides __eq__ loses this method unless it
+        sets __hash__ = Puzzle.__hash__ again.
+
+        @type self: Puzzle
+        @rtype: int
+        """
+        return hash(self.state_hash())
+
+    def heuristic(self):
+        """
+        Return a lower bound on the number of extensions needed to get
+        from Puzzle self to a solution.
+
+        Override this in a subclass to guide informed searches; the
+        default bound of 0 makes them behave like breadth-first search.
+
+        @type self: Puzzle
+        @rtype: int
+        """
+        return 0
+
+    def goal_state(self):
+        """
+        Return the solved Puzzle that Puzzle self works towards.
+
+        This is an optional method, to be implemented in a subclass
+        whose puzzles have exactly one solved configuration, so that
+        the search can also work backwards from it.
+
+        @type self: Puzzle
+        @rtype: Puzzle
+        """
+        raise NotImplementedError
+
+    def reverse_extensions(self):
+        """
+        Return list of Puzzles that have Puzzle self as an extension.
+
+        This is an optional method, to be implemented in a subclass
+        along with goal_state.
+
+        @type self: Puzzle
+        @rtype: list[Puzzle]
+        """
+        raise NotImplementedError
+
+    def canonical_key(self):
+        """
+        Return the state_key of the configuration chosen to stand for
+        every configuration symmetric to Puzzle self.
+
+        Symmetric configurations are equally close to being solved, so
+        searches may treat them as one.  Override this in a subclass
+        whose puzzles have symmetries; by default there are none.
+
+        @type self: Puzzle
+        @rtype: object
+        """
+        return self.state_key()
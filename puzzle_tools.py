@@ -2,7 +2,17 @@
 Some functions for working with puzzles
 """
 from puzzle import Puzzle
-from collections import deque   #import deque
+from collections import deque
+from concurrent.futures import (ProcessPoolExecutor, as_completed, wait,
+                                FIRST_COMPLETED)
+from search_stats import (SearchStats, SearchBudget, BudgetSpent,
+                          BudgetExceeded)
+from transposition_table import HashedTranspositionTable
+import copy
+import heapq
+import multiprocessing
+import signal
+import time
 # set higher recursion limit
 # which is needed in PuzzleNode.__str__
 # you may uncomment the next lines on a unix system such as CDF
@@ -11,108 +21,1273 @@ from collections import deque   #import deque
 import sys
 sys.setrecursionlimit(10**6)
 
-def depth_first_solve(puzzle):
+def depth_first_solve(puzzle, visited=None, symmetry=False, in_place=False,
+                      stats=None, budget=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child containing an extension of the puzzle
     in its parent.  Return None if this is not possible.
 
+    The search uses an explicit stack rather than recursion, and stops
+    as soon as the first solution is found.  The keys of configurations
+    seen are kept in visited, an empty set by default; pass a
+    TranspositionTable to bound its memory or to collect statistics.
+    The keys of the configurations on the current path are also kept
+    apart from visited, so a table that forgets keys may make the search
+    expand a configuration again, but never go round a cycle.
+    A HashedTranspositionTable is given state_hash values in place of
+    keys, which puzzles may keep up to date move by move.
+    If symmetry is True, configurations are recognised by their
+    canonical_key, so symmetric configurations are searched only once;
+    this takes longer for each configuration, and whether it saves time
+    overall depends on the puzzle, as its canonical_key tells.
+    If in_place is True, a single copy of puzzle is changed by its moves
+    and changed back, instead of building a Puzzle per extension; the
+    Puzzle must then implement moves, apply, undo and __copy__.
+    If stats is given, it is updated with what the search does.
+    If budget is given, the search stops once it runs out, returning a
+    BudgetExceeded instead of a solution.
+
+    @type puzzle: Puzzle
+    @type visited: set | TranspositionTable | None
+    @type symmetry: bool
+    @type in_place: bool
+    @type stats: SearchStats | None
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | BudgetExceeded | None
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog"}
+    >>> node = depth_first_solve(WordLadderPuzzle("cat", "dog", ws))
+    >>> while node.children:
+    ...     node = node.children[0]
+    >>> node.puzzle.is_solved()
+    True
+    >>> depth_first_solve(WordLadderPuzzle("cat", "dog", {"cat"})) is None
+    True
+    >>> from transposition_table import BoundedTranspositionTable
+    >>> table = BoundedTranspositionTable(2)
+    >>> depth_first_solve(WordLadderPuzzle("cat", "dog", ws), table) is None
+    False
+    >>> len(table)
+    2
+    >>> from mn_puzzle import MNPuzzle
+    >>> from transposition_table import HashedTranspositionTable
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> m = MNPuzzle((("*", "2", "3"), ("1", "4", "5")), target_grid)
+    >>> for in_place in (False, True):
+    ...     node = depth_first_solve(m, BoundedTranspositionTable(2),
+    ...                              in_place=in_place)
+    ...     while node.children:
+    ...         node = node.children[0]
+    ...     print(node.puzzle.is_solved())
+    True
+    True
+    >>> table = HashedTranspositionTable()
+    >>> node = depth_first_solve(m, table, in_place=True)
+    >>> node is not None and len(table) > 0
+    True
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [[".", "*", "*", "*"], ["*", "*", "*", "*"]]
+    >>> grid += [["*", "*", "*", "*"]]
+    >>> board = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+    >>> node = depth_first_solve(board, in_place=True)
+    >>> node.puzzle == board
+    True
+    >>> while node.children:
+    ...     node = node.children[0]
+    >>> node.puzzle.is_solved()
+    True
+    >>> from search_stats import SearchStats
+    >>> stats = SearchStats()
+    >>> node = depth_first_solve(board, stats=stats)
+    >>> stats.expansions, stats.max_depth, stats.solutions
+    (10, 9, 1)
+    >>> from search_stats import SearchBudget
+    >>> budget = SearchBudget(max_nodes=5)
+    >>> print(depth_first_solve(board, budget=budget))  # doctest: +ELLIPSIS
+    budget exceeded (nodes) after 6 expanded, ...
+    """
+    node = next(depth_first_solve_all(puzzle, visited, symmetry, in_place,
+                                      stats, budget), None)
+    if node is None and budget is not None and budget.exceeded is not None:
+        return budget.exceeded
+    return node
+
+
+def depth_first_solve_all(puzzle, visited=None, symmetry=False,
+                          in_place=False, stats=None, budget=None):
+    """
+    Yield, one at a time and in depth-first order, a path from
+    PuzzleNode(puzzle) to each solution reachable from puzzle.
+
+    Each configuration is visited at most once, so a solution reachable
+    along several routes is yielded only for the first route found.
+    Besides the configurations seen, kept in visited as for
+    depth_first_solve, only the current path is kept between solutions.
+    If symmetry is True, configurations are recognised by their
+    canonical_key, so of several symmetric solutions only one is found.
+    in_place and stats are as for depth_first_solve.  If budget is
+    given, no more paths are yielded once it runs out, and
+    budget.exceeded is set.
+
+    @type puzzle: Puzzle
+    @type visited: set | TranspositionTable | None
+    @type symmetry: bool
+    @type in_place: bool
+    @type stats: SearchStats | None
+    @type budget: SearchBudget | None
+    @rtype: Iterator[PuzzleNode]
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog"}
+    >>> len(list(depth_first_solve_all(WordLadderPuzzle("cat", "dog", ws))))
+    1
+    """
+    if visited is None:
+        visited = set()
+    stats = _charged(budget, stats)
+    try:
+        if in_place:
+            for moves in _depth_first_moves(puzzle, visited, symmetry, stats):
+                yield _chain(_replay(puzzle, moves))
+        else:
+            for path in _depth_first_paths(puzzle, visited,
+                                           symmetry=symmetry, stats=stats):
+                yield _chain(path)
+    except BudgetSpent:
+        return
+    finally:
+        if budget is not None:
+            budget.stop(stats)
+
+
+def _depth_first_paths(puzzle, seen, stop=None, symmetry=False, stats=None):
+    # Yield, in depth-first order, the list of configurations on a path
+    # from puzzle to each solution reachable from puzzle, skipping the
+    # configurations whose keys are in seen; seen is added to as the
+    # search goes, with canonical keys if symmetry is True.  If stop is
+    # given, the search ends early once stop.is_set() is True, which is
+    # checked every _STOP_INTERVAL expansions.  If stats is given, it is
+    # updated as the search goes.
+    #
+    # @type puzzle: Puzzle
+    # @type seen: set[object] | TranspositionTable
+    # @type stop: threading.Event | multiprocessing.Event | None
+    # @type symmetry: bool
+    # @type stats: SearchStats | None
+    # @rtype: Iterator[list[Puzzle]]
+    if puzzle.fail_fast():
+        return
+    if puzzle.is_solved():
+        if stats is not None:
+            stats.solved(puzzle)
+        yield [puzzle]
+        return
+    key_of = _key_function(puzzle, symmetry, seen)
+    fail_fast, is_solved, extensions = _probes(puzzle, stats)
+    keys = [key_of(puzzle)]
+    seen.add(keys[0])
+    if stats is not None:
+        stats.expanded(puzzle, 0, 1, len(seen))
+    # path holds the configurations from puzzle to the top of the stack,
+    # and keys their keys, also kept in on_path: seen may forget them,
+    # but on_path never does, so the search cannot go round a cycle;
+    # stack holds the extensions of each of them not yet tried
+    path, on_path, stack = [puzzle], set(keys), [iter(extensions(puzzle))]
+    expanded = 0
+    while stack:
+        move = next(stack[-1], None)
+        if move is None:
+            stack.pop()
+            path.pop()
+            on_path.discard(keys.pop())
+            continue
+        key = key_of(move)
+        if key in on_path or key in seen:
+            if stats is not None:
+                stats.duplicate(move)
+            continue
+        seen.add(key)
+        if fail_fast(move):
+            if stats is not None:
+                stats.pruned(move)
+            continue
+        if is_solved(move):
+            if stats is not None:
+                stats.solved(move)
+            yield path + [move]
+        else:
+            if stats is not None:
+                stats.expanded(move, len(path), len(path) + 1, len(seen))
+            path.append(move)
+            keys.append(key)
+            on_path.add(key)
+            stack.append(iter(extensions(move)))
+            expanded += 1
+            if (stop is not None and expanded % _STOP_INTERVAL == 0 and
+                    stop.is_set()):
+                return
+
+
+# expansions between checks of a stop event
+_STOP_INTERVAL = 256
+
+
+def _depth_first_moves(puzzle, seen, symmetry=False, stats=None):
+    # Yield, in depth-first order, the list of moves on a path from
+    # puzzle to each solution reachable from puzzle, as for
+    # _depth_first_paths, but by applying moves to one copy of puzzle
+    # and undoing them on the way back.
+    #
+    # @type puzzle: Puzzle
+    # @type seen: set[object] | TranspositionTable
+    # @type symmetry: bool
+    # @type stats: SearchStats | None
+    # @rtype: Iterator[list[object]]
+    if puzzle.fail_fast():
+        return
+    if puzzle.is_solved():
+        if stats is not None:
+            stats.solved(puzzle)
+        yield []
+        return
+    key_of = _key_function(puzzle, symmetry, seen)
+    fail_fast, is_solved, moves = _probes(puzzle, stats, "moves")
+    keys = [key_of(puzzle)]
+    seen.add(keys[0])
+    current = copy.copy(puzzle)
+    if stats is not None:
+        stats.expanded(current, 0, 1, len(seen))
+    # path holds the moves applied to current, and keys the keys of the
+    # configurations along the way, also kept in on_path, which unlike
+    # seen never forgets them; stack holds the moves not yet tried from
+    # each of those configurations
+    path, on_path, stack = [], set(keys), [iter(moves(current))]
+    while stack:
+        move = next(stack[-1], None)
+        if move is None:
+            stack.pop()
+            on_path.discard(keys.pop())
+            if path:
+                current.undo(path.pop())
+            continue
+        current.apply(move)
+        key = key_of(current)
+        if key in on_path or key in seen:
+            if stats is not None:
+                stats.duplicate(current)
+            current.undo(move)
+            continue
+        seen.add(key)
+        if fail_fast(current):
+            if stats is not None:
+                stats.pruned(current)
+            current.undo(move)
+            continue
+        if is_solved(current):
+            if stats is not None:
+                stats.solved(current)
+            yield path + [move]
+            current.undo(move)
+        else:
+            path.append(move)
+            keys.append(key)
+            on_path.add(key)
+            if stats is not None:
+                stats.expanded(current, len(path), len(path) + 1, len(seen))
+            stack.append(iter(moves(current)))
+
+
+def _replay(puzzle, moves):
+    # Return the configurations from puzzle on, each a new Puzzle with
+    # the next of moves applied to the one before.
+    #
+    # @type puzzle: Puzzle
+    # @type moves: list[object]
+    # @rtype: list[Puzzle]
+    path = [puzzle]
+    for move in moves:
+        step = copy.copy(path[-1])
+        step.apply(move)
+        path.append(step)
+    return path
+
+
+def _rebuild(puzzle, keys):
+    # Return the configurations from puzzle on along a path found from
+    # it in another process, given by their state_keys, finding each
+    # among the extensions of the one before, or else, for a path found
+    # in place, among the results of its moves.
+    #
+    # @type puzzle: Puzzle
+    # @type keys: list[object]
+    # @rtype: list[Puzzle]
+    path = [puzzle]
+    for key in keys[1:]:
+        step = next((move for move in path[-1].extensions()
+                     if move.state_key() == key), None)
+        if step is None:
+            for move in path[-1].moves():
+                step = copy.copy(path[-1])
+                step.apply(move)
+                if step.state_key() == key:
+                    break
+        path.append(step)
+    return path
+
+
+def parallel_depth_first_solve(puzzle, workers=None, split_depth=2,
+                               stats=None, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, with each child containing an extension of the puzzle
+    in its parent.  Return None if this is not possible.
+
+    The configurations split_depth extensions away from puzzle are
+    found breadth-first, and the subtree below each is searched
+    depth-first by one of workers processes.  The first solution found
+    is returned and the other searches are told to stop.  Each worker
+    treats every configuration met above or beside its own subtree's
+    start as already seen, so workers do not search from each other's
+    starting points.  puzzle must be picklable.
+
+    If stats is given, it is updated with what the searches do, each
+    worker's counts added once its subtree is done.  If budget is given,
+    its time limit and cancel are watched here, while its limits on
+    nodes and visited configurations apply to each subtree's search on
+    its own; once it runs out, a BudgetExceeded is returned.
+
+    @type puzzle: Puzzle
+    @type workers: int | None
+                   the number of processes; None for one per CPU
+    @type split_depth: int
+    @type stats: SearchStats | None
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | BudgetExceeded | None
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [[".", "*", "*", "*"], ["*", "*", "*", "*"]]
+    >>> grid += [["*", "*", "*", "*"]]
+    >>> board = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+    >>> node = parallel_depth_first_solve(board, workers=2)
+    >>> while node.children:
+    ...     node = node.children[0]
+    >>> node.puzzle.is_solved()
+    True
+    """
+    stats = _charged(budget, stats)
+    try:
+        return _parallel_depth_first(puzzle, workers, split_depth, stats,
+                                     budget)
+    except BudgetSpent:
+        return budget.exceeded
+    finally:
+        if budget is not None:
+            budget.stop(stats)
+
+
+def _parallel_depth_first(puzzle, workers, split_depth, stats, budget):
+    # Return what parallel_depth_first_solve returns, raising
+    # BudgetSpent if budget runs out.
+    #
+    # @type puzzle: Puzzle
+    # @type workers: int | None
+    # @type split_depth: int
+    # @type stats: SearchStats | None
+    # @type budget: SearchBudget | None
+    # @rtype: PuzzleNode | BudgetExceeded | None
+    if puzzle.fail_fast():
+        return None
+    if puzzle.is_solved():
+        return PuzzleNode(puzzle)
+    root_key = puzzle.state_key()
+    parents, states = {root_key: None}, {root_key: puzzle}
+    frontier = [root_key]
+    for depth in range(split_depth):
+        next_frontier = []
+        for key in frontier:
+            if stats is not None:
+                stats.expanded(states[key], depth, len(frontier),
+                               len(parents))
+            for move in states[key].extensions():
+                move_key = move.state_key()
+                if move_key in parents:
+                    continue
+                parents[move_key], states[move_key] = key, move
+                if move.is_solved():
+                    return _build_path(parents, states, move_key)
+                if not move.fail_fast():
+                    next_frontier.append(move_key)
+        frontier = next_frontier
+    # workers get the limits on nodes and visited configurations; time
+    # and cancelling are watched here
+    limits = None
+    if budget is not None:
+        limits = SearchBudget(budget.max_nodes, None, budget.max_visited)
+    spent = None
+    stop = multiprocessing.Event()
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_start_subtree_worker,
+                             initargs=(stop, set(parents),
+                                       [states[key] for key in frontier])
+                             ) as executor:
+        futures = {executor.submit(_solve_subtree, i, limits,
+                                   stats is not None): key
+                   for i, key in enumerate(frontier)}
+        pending = set(futures)
+        try:
+            while pending:
+                done, pending = wait(
+                    pending, None if budget is None else _POLL_SECONDS,
+                    FIRST_COMPLETED)
+                for future in done:
+                    path, reason, subtree_stats = future.result()
+                    if subtree_stats is not None:
+                        stats.merge(subtree_stats)
+                    spent = spent or reason
+                    if path is not None:
+                        start = futures[future]
+                        return _chain(_path_to(parents, states, start) +
+                                      _rebuild(states[start], path)[1:])
+                if budget is not None:
+                    budget.check(stats)
+        finally:
+            stop.set()
+            for future in pending:
+                future.cancel()
+    if spent is not None:
+        return BudgetExceeded(spent, stats)
+    return None
+
+
+# seconds between checks of a budget while waiting for workers
+_POLL_SECONDS = 0.05
+
+
+# state of a worker process started by parallel_depth_first_solve: the
+# event telling it to stop, the keys of configurations searched outside
+# the subtrees it is handed, and the configurations those subtrees start
+# from, sent once so that tables they share are sent only once
+_subtree_stop, _subtree_seen, _subtree_starts = None, set(), []
+
+
+def _start_subtree_worker(stop, seen, starts):
+    # Set up a worker process for parallel_depth_first_solve.
+    #
+    # @type stop: multiprocessing.Event
+    # @type seen: set[object]
+    # @type starts: list[Puzzle]
+    # @rtype: None
+    global _subtree_stop, _subtree_seen, _subtree_starts
+    _subtree_stop, _subtree_seen, _subtree_starts = stop, seen, starts
+
+
+def _solve_subtree(start, limits=None, counted=False):
+    # Return the state_keys of the configurations on a path to a
+    # solution from the subtree start with index start, found
+    # depth-first in a worker process, or None if there is none or
+    # another worker found a solution first; the reason limits ran out,
+    # or None; and the SearchStats of the search if counted is True or
+    # there are limits, otherwise None.
+    #
+    # @type start: int
+    # @type limits: SearchBudget | None
+    # @type counted: bool
+    # @rtype: (list[object] | None, str | None, SearchStats | None)
+    if _subtree_stop.is_set():
+        return None, None, None
+    puzzle = _subtree_starts[start]
+    seen = _subtree_seen - {puzzle.state_key()}
+    stats = SearchStats() if counted else None
+    stats = _charged(limits, stats)
+    try:
+        path = next(_depth_first_paths(puzzle, seen, _subtree_stop,
+                                       stats=stats), None)
+    except BudgetSpent:
+        return None, limits.exceeded.reason, stats
+    finally:
+        if limits is not None:
+            limits.stop(stats)
+    if path is not None:
+        path = [move.state_key() for move in path]
+    return path, None, stats
+
+
+def breadth_first_solve(puzzle, symmetry=False, stats=None, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, with each child PuzzleNode containing an extension
+    of the puzzle in its parent.  Return None if this is not possible.
+
+    The frontier is a FIFO queue, so the path returned uses the fewest
+    possible extensions.  Only parent links are remembered while
+    searching; PuzzleNodes are built for the winning path alone.
+    If symmetry is True, configurations are recognised by their
+    canonical_key, so symmetric configurations are searched only once.
+    If stats is given, it is updated with what the search does.
+    If budget is given, the search stops once it runs out, returning a
+    BudgetExceeded instead of a solution.
+
     @type puzzle: Puzzle
-    @rtype: PuzzleNode
+    @type symmetry: bool
+    @type stats: SearchStats | None
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | BudgetExceeded | None
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog", "cab"}
+    >>> node = breadth_first_solve(WordLadderPuzzle("cat", "dog", ws))
+    >>> path = []
+    >>> while node:
+    ...     path.append(node.puzzle._from_word)
+    ...     node = node.children[0] if node.children else None
+    >>> path
+    ['cat', 'cot', 'cog', 'dog']
+    >>> breadth_first_solve(WordLadderPuzzle("cat", "dog", {"cat"})) is None
+    True
     """
-    options = depth_first_solve_solution({}, puzzle)
-    if not options:
-        return PuzzleNode(puzzle, [])
-    # returns the first node from the given configuration to a solution
-    return options[0]
+    if puzzle.fail_fast():
+        return None
+    stats = _charged(budget, stats)
+    try:
+        path = next(_breadth_first_paths(puzzle, symmetry, stats), None)
+    except BudgetSpent:
+        return budget.exceeded
+    finally:
+        if budget is not None:
+            budget.stop(stats)
+    return _chain(path) if path else None
+
+
+def _breadth_first_paths(puzzle, symmetry=False, stats=None):
+    # Yield, in breadth-first order, the list of configurations on a
+    # shortest path from puzzle to each solution reachable from puzzle.
+    # Configurations are recognised by canonical keys if symmetry is
+    # True.  Solutions are not extended further.  If stats is given, it
+    # is updated as the search goes.
+    #
+    # @type puzzle: Puzzle
+    # @type symmetry: bool
+    # @type stats: SearchStats | None
+    # @rtype: Iterator[list[Puzzle]]
+    if puzzle.fail_fast():
+        return
+    if puzzle.is_solved():
+        if stats is not None:
+            stats.solved(puzzle)
+        yield [puzzle]
+        return
+    key_of = _key_function(puzzle, symmetry)
+    fail_fast, is_solved, extensions = _probes(puzzle, stats)
+    root_key = key_of(puzzle)
+    # parent key of every state seen so far, and the state for each key
+    parents, states = {root_key: None}, {root_key: puzzle}
+    frontier = deque([root_key])
+    while frontier:
+        key = frontier.popleft()
+        if stats is not None:
+            stats.expanded(states[key], _depth(parents, key),
+                           len(frontier) + 1, len(parents))
+        for move in extensions(states[key]):
+            move_key = key_of(move)
+            if move_key in parents:
+                if stats is not None:
+                    stats.duplicate(move)
+                continue
+            parents[move_key], states[move_key] = key, move
+            if is_solved(move):
+                if stats is not None:
+                    stats.solved(move)
+                yield _path_to(parents, states, move_key)
+            elif not fail_fast(move):
+                frontier.append(move_key)
+            elif stats is not None:
+                stats.pruned(move)
 
-def depth_first_solve_solution(dic, puzzle):
+
+def bidirectional_solve(puzzle, stats=None, budget=None):
     """
-    It's helper function of the main method which finds a PuzzleNode(puzzle)
-    tha contains the solution and each of the child are extension of the current
-    puzzle configuration. Returns the valid solution in the list
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, using as few extensions as possible, with each child
+    containing an extension of the puzzle in its parent.  Return None
+    if this is not possible.
+
+    Breadth-first searches run forwards from puzzle and backwards from
+    puzzle.goal_state(), a whole level at a time, always growing the
+    smaller frontier; the path is spliced together where they meet.
+    puzzle must implement goal_state and reverse_extensions.  If stats
+    is given, it is updated with what the search does; depths are
+    counted from whichever end a configuration was reached from.
+    If budget is given, the search stops once it runs out, returning a
+    BudgetExceeded instead of a solution.
+
+    @type puzzle: Puzzle
+    @type stats: SearchStats | None
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | BudgetExceeded | None
 
-    @type puzzle: dic, Puzzle
-    @rtype: list[object]
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog", "cab"}
+    >>> node = bidirectional_solve(WordLadderPuzzle("cat", "dog", ws))
+    >>> path = []
+    >>> while node:
+    ...     path.append(node.puzzle.state_key())
+    ...     node = node.children[0] if node.children else None
+    >>> path
+    ['cat', 'cot', 'cog', 'dog']
+    >>> bidirectional_solve(WordLadderPuzzle("cat", "dog", {"cat"})) is None
+    True
     """
-    #Checks for fail fast
+    stats = _charged(budget, stats)
+    try:
+        return _bidirectional(puzzle, stats)
+    except BudgetSpent:
+        return budget.exceeded
+    finally:
+        if budget is not None:
+            budget.stop(stats)
+
+
+def _bidirectional(puzzle, stats=None):
+    # Return what bidirectional_solve(puzzle, stats) returns, without a
+    # budget.
+    #
+    # @type puzzle: Puzzle
+    # @type stats: SearchStats | None
+    # @rtype: PuzzleNode | None
     if puzzle.fail_fast():
-         return []
-    # if already seen, go to next step
-    if str(puzzle) in dic:  # as seen before
-        return []
-    sol = PuzzleNode(puzzle)
-    dic[str(puzzle)] = 1
-    # Check if the puzzle configuration is solved
+        return None
     if puzzle.is_solved():
-       return [PuzzleNode(puzzle)]
-    # go through the extension of the current puzzle configuration
-    for move in puzzle.extensions():
-        sol.children = sol.children + depth_first_solve_solution(dic, move) # recursively calling
-    if sol.children == []:
-        return []
-    # return solution in the list
-    return [sol]
+        if stats is not None:
+            stats.solved(puzzle)
+        return PuzzleNode(puzzle)
+    fail_fast, _, extensions = _probes(puzzle, stats)
+    reverse_extensions = _probes(puzzle, stats, "reverse_extensions")[2]
+    goal = puzzle.goal_state()
+    start_key, goal_key = puzzle.state_key(), goal.state_key()
+    # parents point back towards puzzle going forwards, and towards
+    # the goal going backwards
+    forward = ({start_key: None}, {start_key: puzzle}, [start_key])
+    backward = ({goal_key: None}, {goal_key: goal}, [goal_key])
+    while forward[2] and backward[2]:
+        growing_forward = len(forward[2]) <= len(backward[2])
+        if growing_forward:
+            (parents, states, frontier), other = forward, backward[0]
+        else:
+            (parents, states, frontier), other = backward, forward[0]
+        # meeting points found on this level, as (path length, key)
+        meetings, next_frontier = [], []
+        for key in frontier:
+            if stats is not None:
+                stats.expanded(states[key], _depth(parents, key),
+                               len(forward[2]) + len(backward[2]),
+                               len(forward[0]) + len(backward[0]))
+            if growing_forward:
+                moves = extensions(states[key])
+            else:
+                moves = reverse_extensions(states[key])
+            for move in moves:
+                move_key = move.state_key()
+                if move_key in parents:
+                    if stats is not None:
+                        stats.duplicate(move)
+                    continue
+                if growing_forward and fail_fast(move):
+                    if stats is not None:
+                        stats.pruned(move)
+                    continue
+                parents[move_key], states[move_key] = key, move
+                if move_key in other:
+                    meetings.append(
+                        (_depth(forward[0], move_key) +
+                         _depth(backward[0], move_key), move_key))
+                next_frontier.append(move_key)
+        if meetings:
+            if stats is not None:
+                stats.solved(goal)
+            return _splice(forward, backward, min(meetings)[1])
+        frontier[:] = next_frontier
+    return None
+
+
+def _depth(parents, key):
+    # Return the number of parent links from key to the start of a search.
+    #
+    # @type parents: dict[object, object]
+    # @type key: object
+    # @rtype: int
+    depth = 0
+    while parents[key] is not None:
+        key, depth = parents[key], depth + 1
+    return depth
 
 
-def breadth_first_solve(puzzle):
+def _splice(forward, backward, key):
+    # Return the root of a chain of PuzzleNodes from the start of the
+    # forward search, through the configuration under key where both
+    # searches met, to the goal the backward search started from.
+    #
+    # @type forward: (dict, dict, list)
+    # @type backward: (dict, dict, list)
+    # @type key: object
+    # @rtype: PuzzleNode
+    (forward_parents, forward_states, _), (parents, states, _) = (forward,
+                                                                 backward)
+    puzzles = []
+    k = key
+    while k is not None:
+        puzzles.append(forward_states[k])
+        k = forward_parents[k]
+    puzzles.reverse()
+    k = parents[key]
+    while k is not None:
+        puzzles.append(states[k])
+        k = parents[k]
+    return _chain(puzzles)
+
+
+def astar_solve(puzzle, heuristic=None, stats=None, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, using as few extensions as possible, with each child
+    containing an extension of the puzzle in its parent.  Return None
+    if this is not possible.
+
+    Configurations are expanded cheapest-first from a binary heap,
+    ordered by extensions so far plus heuristic(configuration), which
+    must never overestimate the extensions still needed.  By default
+    each configuration's own heuristic method is used.  If stats is
+    given, it is updated with what the search does.
+    If budget is given, the search stops once it runs out, returning a
+    BudgetExceeded instead of a solution.
+
+    @type puzzle: Puzzle
+    @type heuristic: (Puzzle) -> int | None
+    @type stats: SearchStats | None
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | BudgetExceeded | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> node = astar_solve(MNPuzzle(start_grid, target_grid))
+    >>> moves = 0
+    >>> while node.children:
+    ...     node, moves = node.children[0], moves + 1
+    >>> moves
+    3
+    """
+    stats = _charged(budget, stats)
+    try:
+        path = next(_astar_paths(puzzle, heuristic, stats), None)
+    except BudgetSpent:
+        return budget.exceeded
+    finally:
+        if budget is not None:
+            budget.stop(stats)
+    return _chain(path) if path else None
+
+
+def _astar_paths(puzzle, heuristic=None, stats=None):
+    # Yield, cheapest first, the list of configurations on a path from
+    # puzzle to each solution reachable from puzzle, as astar_solve
+    # finds them.  Solutions are not extended further.  If stats is
+    # given, it is updated as the search goes.
+    #
+    # @type puzzle: Puzzle
+    # @type heuristic: (Puzzle) -> int | None
+    # @type stats: SearchStats | None
+    # @rtype: Iterator[list[Puzzle]]
+    if heuristic is None:
+        heuristic = _own_heuristic
+    if puzzle.fail_fast():
+        return
+    fail_fast, is_solved, extensions = _probes(puzzle, stats)
+    root_key = puzzle.state_key()
+    parents, states, costs = {root_key: None}, {root_key: puzzle}, {root_key: 0}
+    # entries are (estimated total, tie-breaker, extensions so far, key);
+    # the tie-breaker keeps the heap from ever comparing keys
+    frontier = [(heuristic(puzzle), 0, 0, root_key)]
+    pushed = 1
+    while frontier:
+        _, _, cost, key = heapq.heappop(frontier)
+        if cost > costs[key]:
+            # a cheaper route to key was found after this entry was pushed
+            continue
+        current = states[key]
+        if is_solved(current):
+            if stats is not None:
+                stats.solved(current)
+            yield _path_to(parents, states, key)
+            continue
+        if stats is not None:
+            stats.expanded(current, cost, len(frontier) + 1, len(costs))
+        for move in extensions(current):
+            move_key = move.state_key()
+            if move_key in costs and costs[move_key] <= cost + 1:
+                if stats is not None:
+                    stats.duplicate(move)
+                continue
+            if fail_fast(move):
+                if stats is not None:
+                    stats.pruned(move)
+                continue
+            parents[move_key], states[move_key] = key, move
+            costs[move_key] = cost + 1
+            heapq.heappush(frontier, (cost + 1 + heuristic(move), pushed,
+                                      cost + 1, move_key))
+            pushed += 1
+
+
+def ida_star_solve(puzzle, heuristic=None, stats=None, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, using as few extensions as possible, with each child
+    containing an extension of the puzzle in its parent.  Return None
+    if this is not possible.
+
+    Iterative-deepening A*: repeated depth-first searches, each cut off
+    where extensions so far plus heuristic(configuration) exceeds a bound
+    raised to the smallest value cut off by the previous search.  Memory
+    is only the current path, at the cost of re-expanding configurations.
+    heuristic must never overestimate; by default each configuration's
+    own heuristic method is used.  If stats is given, it is updated with
+    what the search does, counting a configuration again each time it
+    is re-expanded.
+    If budget is given, the search stops once it runs out, returning a
+    BudgetExceeded instead of a solution.
+
+    @type puzzle: Puzzle
+    @type heuristic: (Puzzle) -> int | None
+    @type stats: SearchStats | None
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | BudgetExceeded | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> node = ida_star_solve(MNPuzzle(start_grid, target_grid))
+    >>> moves = 0
+    >>> while node.children:
+    ...     node, moves = node.children[0], moves + 1
+    >>> moves
+    3
+    """
+    stats = _charged(budget, stats)
+    try:
+        return _ida_star(puzzle, heuristic, stats)
+    except BudgetSpent:
+        return budget.exceeded
+    finally:
+        if budget is not None:
+            budget.stop(stats)
+
+
+def _ida_star(puzzle, heuristic=None, stats=None):
+    # Return what ida_star_solve(puzzle, heuristic, stats) returns,
+    # without a budget.
+    #
+    # @type puzzle: Puzzle
+    # @type heuristic: (Puzzle) -> int | None
+    # @type stats: SearchStats | None
+    # @rtype: PuzzleNode | None
+    if heuristic is None:
+        heuristic = _own_heuristic
+    if puzzle.fail_fast():
+        return None
+    if puzzle.is_solved():
+        if stats is not None:
+            stats.solved(puzzle)
+        return PuzzleNode(puzzle)
+    fail_fast, is_solved, extensions = _probes(puzzle, stats)
+    bound = heuristic(puzzle)
+    while True:
+        # smallest estimate that exceeded bound during this pass
+        next_bound = None
+        path, keys = [puzzle], [puzzle.state_key()]
+        if stats is not None:
+            stats.expanded(puzzle, 0, 1, 1)
+        on_path, stack = set(keys), [iter(extensions(puzzle))]
+        while stack:
+            move = next(stack[-1], None)
+            if move is None:
+                stack.pop()
+                path.pop()
+                on_path.discard(keys.pop())
+                continue
+            key = move.state_key()
+            if key in on_path:
+                if stats is not None:
+                    stats.duplicate(move)
+                continue
+            if fail_fast(move):
+                if stats is not None:
+                    stats.pruned(move)
+                continue
+            estimate = len(path) + heuristic(move)
+            if estimate > bound:
+                if next_bound is None or estimate < next_bound:
+                    next_bound = estimate
+                continue
+            if is_solved(move):
+                if stats is not None:
+                    stats.solved(move)
+                return _chain(path + [move])
+            if stats is not None:
+                stats.expanded(move, len(path), len(path) + 1, len(on_path))
+            path.append(move)
+            keys.append(key)
+            on_path.add(key)
+            stack.append(iter(extensions(move)))
+        if next_bound is None:
+            return None
+        bound = next_bound
+
+
+def iter_solutions(puzzle, strategy=depth_first_solve, limit=None,
+                   stats=None, budget=None):
+    """
+    Yield, one at a time, the list of configurations on a path from
+    puzzle to each solution reachable from puzzle, in the order strategy
+    would find them, stopping after limit solutions if limit is given.
+
+    strategy is depth_first_solve, breadth_first_solve or astar_solve;
+    any other raises ValueError.  Each configuration is visited once, so
+    each solved configuration is yielded once, along the first path
+    found to it.  Nothing is searched until the next solution is asked
+    for, and only the search's own record of configurations seen is
+    kept between solutions.  If stats is given, it is updated with what
+    the search does.  If budget is given, no more paths are yielded
+    once it runs out, and budget.exceeded is set.
+
+    @type puzzle: Puzzle
+    @type strategy: (Puzzle) -> PuzzleNode | None
+    @type limit: int | None
+    @type stats: SearchStats | None
+    @type budget: SearchBudget | None
+    @rtype: Iterator[list[Puzzle]]
+
+    >>> from sudoku_puzzle import SudokuPuzzle
+    >>> grid = ["A", "B", "C", "D"]
+    >>> grid += ["C", "D", "A", "B"]
+    >>> grid += ["*", "*", "*", "*"]
+    >>> grid += ["*", "*", "*", "*"]
+    >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+    >>> len(list(iter_solutions(s)))
+    4
+    >>> len(list(iter_solutions(s, breadth_first_solve, limit=2)))
+    2
+    >>> iter_solutions(s, ida_star_solve)  # doctest: +ELLIPSIS
+    Traceback (most recent call last):
+    ...
+    ValueError: iter_solutions takes ... depth_first_solve, not ida_star_solve
+    """
+    if strategy not in _PATH_GENERATORS:
+        names = sorted(s.__name__ for s in _PATH_GENERATORS)
+        raise ValueError("iter_solutions takes {} or {}, not {}".format(
+            ", ".join(names[:-1]), names[-1],
+            getattr(strategy, "__name__", strategy)))
+    return _iter_paths(puzzle, strategy, limit, stats, budget)
+
+
+def _iter_paths(puzzle, strategy, limit, stats, budget):
+    # Yield the paths iter_solutions yields, once it has checked that
+    # strategy is one it takes, so that a bad strategy is reported
+    # when iter_solutions is called rather than when it is first used.
+    #
+    # @type puzzle: Puzzle
+    # @type strategy: (Puzzle) -> PuzzleNode | None
+    # @type limit: int | None
+    # @type stats: SearchStats | None
+    # @type budget: SearchBudget | None
+    # @rtype: Iterator[list[Puzzle]]
+    if limit is not None and limit <= 0:
+        return
+    stats = _charged(budget, stats)
+    try:
+        paths = _PATH_GENERATORS[strategy](puzzle, stats)
+        for count, path in enumerate(paths, 1):
+            yield path
+            if count == limit:
+                return
+    except BudgetSpent:
+        return
+    finally:
+        if budget is not None:
+            budget.stop(stats)
+
+
+# generators of solution paths behind each strategy iter_solutions takes
+_PATH_GENERATORS = {
+    depth_first_solve: lambda puzzle, stats: _depth_first_paths(
+        puzzle, set(), stats=stats),
+    breadth_first_solve: lambda puzzle, stats: _breadth_first_paths(
+        puzzle, stats=stats),
+    astar_solve: lambda puzzle, stats: _astar_paths(puzzle, stats=stats)}
+
+
+class BatchResult:
+    """
+    The outcome of solving one puzzle of a batch.
+    """
+
+    def __init__(self, index, solution, seconds, timed_out=False):
+        """
+        Create a new BatchResult self for the puzzle at position index
+        of its batch, solved by solution in seconds.
+
+        @type self: BatchResult
+        @type index: int
+        @type solution: PuzzleNode | None
+                        None if there is no solution or time ran out
+        @type seconds: float
+        @type timed_out: bool
+        @rtype: None
+        """
+        self.index, self.solution = index, solution
+        self.seconds, self.timed_out = seconds, timed_out
+
+    def __str__(self):
+        """
+        Return a human-readable string representation of BatchResult self.
+
+        >>> print(BatchResult(3, None, 0.5, True))
+        puzzle 3: timed out after 0.5 seconds
+        >>> print(BatchResult(0, None, 0.25))
+        puzzle 0: no solution, 0.25 seconds
+        """
+        if self.timed_out:
+            outcome = "timed out after"
+        elif self.solution is None:
+            outcome = "no solution,"
+        else:
+            outcome = "solved in"
+        return "puzzle {}: {} {} seconds".format(self.index, outcome,
+                                                 self.seconds)
+
+
+def solve_batch(puzzles, strategy=depth_first_solve, workers=None,
+                chunksize=1, timeout=None, ordered=False):
+    """
+    Solve each of puzzles with strategy, spread over worker processes,
+    and yield a BatchResult for each puzzle as soon as it is known.
+
+    Every worker is sent puzzles once, when it starts, so tables they
+    share, such as a WordGraph, are sent and rebuilt once per worker,
+    and is then told which of them to solve chunksize at a time.  The
+    solution paths come back as state_keys and are rebuilt here from
+    the extensions of each puzzle.  Results come back in the order they
+    finish, or in the order of puzzles if ordered is True.  A puzzle
+    still unsolved after timeout seconds is given up on; timeouts need
+    SIGALRM, so they are ignored on systems without it.
+    strategy and puzzles must be picklable, so strategy should be a
+    function defined at the top level of a module, such as
+    depth_first_solve or breadth_first_solve.
+
+    @type puzzles: iterable[Puzzle]
+    @type strategy: (Puzzle) -> PuzzleNode | None
+    @type workers: int | None
+                   the number of processes; None for one per CPU
+    @type chunksize: int
+    @type timeout: float | None
+    @type ordered: bool
+    @rtype: Iterator[BatchResult]
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot", "cog", "dog"}
+    >>> ladders = [WordLadderPuzzle(w, "dog", ws) for w in ["cat", "cog"]]
+    >>> results = solve_batch(ladders, breadth_first_solve, workers=2,
+    ...                       ordered=True)
+    >>> [r.index for r in results]
+    [0, 1]
+    """
+    puzzles = list(puzzles)
+    chunks = [list(range(start, min(start + chunksize, len(puzzles))))
+              for start in range(0, len(puzzles), chunksize)]
+    with ProcessPoolExecutor(max_workers=workers,
+                             initializer=_start_batch_worker,
+                             initargs=(strategy, puzzles)) as executor:
+        futures = [executor.submit(_solve_chunk, chunk, timeout)
+                   for chunk in chunks]
+        # results finished but waiting for earlier ones, by index
+        waiting, next_index = {}, 0
+        for future in as_completed(futures):
+            for index, keys, seconds, timed_out in future.result():
+                solution = None
+                if keys is not None:
+                    solution = _chain(_rebuild(puzzles[index], keys))
+                result = BatchResult(index, solution, seconds, timed_out)
+                if not ordered:
+                    yield result
+                    continue
+                waiting[index] = result
+                while next_index in waiting:
+                    yield waiting.pop(next_index)
+                    next_index += 1
+
+
+class _Timeout(Exception):
+    # Raised in a worker process when a puzzle's time is up.
     pass
-    # we spend a lot of time on it, please consider this while marking
-    # I commented it up, because is coming in a way for depth search
-    # Thanks a lot
-
-    list = []
-
-    def breadth_first_solve_solution(puzzle):\
-        pass
-    ''''
-        #print(puzzle)
-        list.append(puzzle)
-        #print(list)
-
-        sol = PuzzleNode(puzzle)
-        if puzzle.is_solved():
-            #print("Sdss")
-            return [PuzzleNode(puzzle)]
-
-        for move in puzzle.extensions():
-            #print("ss")
-            if move.is_solved():
-                print("aa")
-                return [PuzzleNode(move)]
-
-        for move in puzzle.extensions():
-            #print("move")
-
-            #print("x")
-            x = breadth_first_solve_solution(move)
-
-            if puzzle in list:
-                return None
-
-            if x is not None:
-                print(x)
-                return "sth"
-
-        solution = breadth_first_solve_solution(Puzzle)
-        counter = len(solution)
-        while counter > 0:
-            node = PuzzleNode(solution[counter], )
-            counter -=1
-        nodes = []
-        for sol in solution:
-            node = puzzlenode(sol)
-            nodes.append(node)
-            return nodes[0]
-
-        length = len(nodes)
-
-        for x in range(length):
-            nodes[x].children = [nodes[x+1]]
-            counter = counter -1
-        return nodes[0]
-
-    return breadth_first_solve_solution(puzzle)'''
+
+
+def _raise_timeout(signum, frame):
+    # Signal handler ending the current solve in a worker process.
+    raise _Timeout
+
+
+# state of a worker process started by solve_batch: the strategy, and
+# the puzzles of the batch
+_batch_strategy, _batch_puzzles = None, []
+
+
+def _start_batch_worker(strategy, puzzles):
+    # Set up a worker process for solve_batch.
+    #
+    # @type strategy: (Puzzle) -> PuzzleNode | None
+    # @type puzzles: list[Puzzle]
+    # @rtype: None
+    global _batch_strategy, _batch_puzzles
+    _batch_strategy, _batch_puzzles = strategy, puzzles
+
+
+def _solve_chunk(chunk, timeout):
+    # Solve each puzzle of the batch whose index is in chunk, giving up
+    # on any puzzle after timeout seconds, and return a list of
+    # (index, state_keys along the solution path or None, seconds,
+    # timed out).  Keys, unlike Puzzles, pickle without sending the
+    # tables the puzzles share.
+    #
+    # @type chunk: list[int]
+    # @type timeout: float | None
+    # @rtype: list[(int, list[object] | None, float, bool)]
+    strategy = _batch_strategy
+    use_alarm = timeout is not None and hasattr(signal, "SIGALRM")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _raise_timeout)
+    results = []
+    for index in chunk:
+        puzzle = _batch_puzzles[index]
+        start = time.time()
+        path, timed_out = None, False
+        try:
+            if use_alarm:
+                signal.setitimer(signal.ITIMER_REAL, timeout)
+            try:
+                node = strategy(puzzle)
+            finally:
+                if use_alarm:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            if node is not None:
+                path = []
+                while node is not None:
+                    path.append(node.puzzle.state_key())
+                    node = node.children[0] if node.children else None
+        except _Timeout:
+            timed_out = True
+        results.append((index, path, time.time() - start, timed_out))
+    return results
+
+
+def _own_heuristic(puzzle):
+    # Return puzzle's own estimate of the extensions left to solve it.
+    #
+    # @type puzzle: Puzzle
+    # @rtype: int
+    return puzzle.heuristic()
+
+
+def _key_function(puzzle, symmetry, seen=None):
+    # Return the method giving the keys by which a search starting from
+    # puzzle recognises configurations: canonical_key if symmetry is
+    # True, otherwise state_hash if they go into seen, a
+    # HashedTranspositionTable keeping only 64-bit hashes anyway, and
+    # state_key if not.
+    #
+    # @type puzzle: Puzzle
+    # @type symmetry: bool
+    # @type seen: set[object] | TranspositionTable | None
+    # @rtype: (Puzzle) -> object
+    if symmetry:
+        return type(puzzle).canonical_key
+    if isinstance(seen, HashedTranspositionTable):
+        return type(puzzle).state_hash
+    return type(puzzle).state_key
+
+
+def _charged(budget, stats):
+    # Return the SearchStats for a search to update: stats, or a new
+    # SearchStats if there is a budget but no stats.  budget, if given,
+    # is started on it, to be stopped when the search ends.
+    #
+    # @type budget: SearchBudget | None
+    # @type stats: SearchStats | None
+    # @rtype: SearchStats | None
+    if budget is None:
+        return stats
+    if stats is None:
+        stats = SearchStats()
+    budget.start(stats)
+    return stats
+
+
+def _probes(puzzle, stats, expand="extensions"):
+    # Return fail_fast, is_solved and the method named expand of the
+    # class of puzzle, as functions of a configuration, timed by stats
+    # if stats.timed is True.  Every configuration a search meets is of
+    # the same class as the one it starts from.
+    #
+    # @type puzzle: Puzzle
+    # @type stats: SearchStats | None
+    # @type expand: str
+    # @rtype: ((Puzzle) -> bool, (Puzzle) -> bool, (Puzzle) -> list)
+    names, cls = ("fail_fast", "is_solved", expand), type(puzzle)
+    if stats is None or not stats.timed:
+        return tuple(getattr(cls, name) for name in names)
+    return tuple(stats.timer(cls, name) for name in names)
+
+
+def _build_path(parents, states, key):
+    # Return the root of a chain of PuzzleNodes leading from the start
+    # of a search to the state stored under key, following parents.
+    #
+    # @type parents: dict[object, object]
+    # @type states: dict[object, Puzzle]
+    # @type key: object
+    # @rtype: PuzzleNode
+    return _chain(_path_to(parents, states, key))
+
+
+def _path_to(parents, states, key):
+    # Return the list of states from the start of a search to the
+    # state stored under key, following parents.
+    #
+    # @type parents: dict[object, object]
+    # @type states: dict[object, Puzzle]
+    # @type key: object
+    # @rtype: list[Puzzle]
+    puzzles = []
+    while key is not None:
+        puzzles.append(states[key])
+        key = parents[key]
+    puzzles.reverse()
+    return puzzles
+
+
+def _chain(puzzles):
+    # Return the root of a chain of PuzzleNodes, one per puzzle in
+    # puzzles, each the only child of the one before it.
+    #
+    # @type puzzles: list[Puzzle]
+    # @rtype: PuzzleNode
+    root = node = PuzzleNode(puzzles[0])
+    for p in puzzles[1:]:
+        child = PuzzleNode(p, parent=node)
+        node.children.append(child)
+        node = child
+    return root
+
 
 # Class PuzzleNode helps build trees of PuzzleNodes that have
 # an arbitrary number of children, and a parent.
@@ -0,0 +1,383 @@
+"""
+Counters, timings and tracing for the searches in puzzle_tools, which
+update a SearchStats passed to them as they go, and budgets limiting
+how far those searches may go.
+"""
+import time
+
+# expansions between checks of the clock and of a cancellation token
+_CHECK_INTERVAL = 64
+
+
+class SearchStats:
+    """
+    What a search has done so far: configurations expanded, extensions
+    pruned as already seen (duplicates) or by fail_fast, and the largest
+    depth, frontier and number of configurations remembered as seen
+    (visited) reached.  For depth-first searches the frontier is the
+    open path.
+
+    If timed is True, the seconds spent in each puzzle class's
+    extensions (or moves, or reverse_extensions), is_solved and
+    fail_fast are added up in timings.  If tracer is given, it is called
+    as tracer(event, puzzle, stats) on each "expand", "duplicate",
+    "fail_fast" and "solution"; searches given no SearchStats pay for
+    none of this.
+    """
+
+    def __init__(self, timed=False, tracer=None):
+        """
+        Create a new SearchStats self with every count at 0.
+
+        @type self: SearchStats
+        @type timed: bool
+        @type tracer: (str, Puzzle, SearchStats) -> object | None
+        @rtype: None
+        """
+        self.expansions, self.duplicates, self.fail_fast_prunes = 0, 0, 0
+        self.solutions, self.max_depth, self.max_frontier = 0, 0, 0
+        self.max_visited = 0
+        self.timed, self.tracer = timed, tracer
+        # puzzle class name -> method name -> seconds
+        self.timings = {}
+        # the SearchBudget charged for each expansion, while a search
+        # given one is running
+        self.budget = None
+
+    def expanded(self, puzzle, depth, frontier, visited=0):
+        """
+        Record that puzzle, depth extensions from the start, is about to
+        be expanded with frontier configurations waiting and visited
+        configurations remembered as seen.
+
+        If a SearchBudget is running on self, it is charged for the
+        expansion and may raise BudgetSpent.
+
+        @type self: SearchStats
+        @type puzzle: Puzzle
+        @type depth: int
+        @type frontier: int
+        @type visited: int
+        @rtype: None
+
+        >>> events = []
+        >>> stats = SearchStats(tracer=lambda e, p, s: events.append(e))
+        >>> stats.expanded("root", 0, 1)
+        >>> stats.expanded("child", 1, 3)
+        >>> stats.expansions, stats.max_depth, stats.max_frontier
+        (2, 1, 3)
+        >>> events
+        ['expand', 'expand']
+        """
+        self.expansions += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if frontier > self.max_frontier:
+            self.max_frontier = frontier
+        if visited > self.max_visited:
+            self.max_visited = visited
+        if self.tracer is not None:
+            self.tracer("expand", puzzle, self)
+        if self.budget is not None:
+            self.budget.charge(self)
+
+    def duplicate(self, puzzle):
+        """
+        Record that puzzle was skipped as already seen.
+
+        @type self: SearchStats
+        @type puzzle: Puzzle
+        @rtype: None
+        """
+        self.duplicates += 1
+        if self.tracer is not None:
+            self.tracer("duplicate", puzzle, self)
+
+    def pruned(self, puzzle):
+        """
+        Record that puzzle was skipped because puzzle.fail_fast() is True.
+
+        @type self: SearchStats
+        @type puzzle: Puzzle
+        @rtype: None
+        """
+        self.fail_fast_prunes += 1
+        if self.tracer is not None:
+            self.tracer("fail_fast", puzzle, self)
+
+    def solved(self, puzzle):
+        """
+        Record that puzzle was found to be solved.
+
+        @type self: SearchStats
+        @type puzzle: Puzzle
+        @rtype: None
+        """
+        self.solutions += 1
+        if self.tracer is not None:
+            self.tracer("solution", puzzle, self)
+
+    def timer(self, cls, name):
+        """
+        Return a function calling method name of puzzle class cls on the
+        puzzle it is given, adding the time taken to self.timings.
+
+        @type self: SearchStats
+        @type cls: type
+        @type name: str
+        @rtype: (Puzzle) -> object
+
+        >>> from word_ladder_puzzle import WordLadderPuzzle
+        >>> stats = SearchStats(timed=True)
+        >>> is_solved = stats.timer(WordLadderPuzzle, "is_solved")
+        >>> is_solved(WordLadderPuzzle("cat", "cat", {"cat"}))
+        True
+        >>> list(stats.timings["WordLadderPuzzle"])
+        ['is_solved']
+        """
+        method, clock = getattr(cls, name), time.perf_counter
+        seconds = self.timings.setdefault(cls.__name__, {})
+        seconds.setdefault(name, 0.0)
+
+        def timed(puzzle):
+            start = clock()
+            result = method(puzzle)
+            seconds[name] += clock() - start
+            return result
+        return timed
+
+    def merge(self, other):
+        """
+        Add the counts and timings of SearchStats other, for a separate
+        search, to those of SearchStats self.
+
+        @type self: SearchStats
+        @type other: SearchStats
+        @rtype: None
+
+        >>> stats, other = SearchStats(), SearchStats()
+        >>> stats.expanded("a", 3, 1)
+        >>> other.expanded("b", 2, 5)
+        >>> stats.merge(other)
+        >>> stats.expansions, stats.max_depth, stats.max_frontier
+        (2, 3, 5)
+        """
+        self.expansions += other.expansions
+        self.duplicates += other.duplicates
+        self.fail_fast_prunes += other.fail_fast_prunes
+        self.solutions += other.solutions
+        self.max_depth = max(self.max_depth, other.max_depth)
+        self.max_frontier = max(self.max_frontier, other.max_frontier)
+        self.max_visited = max(self.max_visited, other.max_visited)
+        for cls, seconds in other.timings.items():
+            mine = self.timings.setdefault(cls, {})
+            for name, t in seconds.items():
+                mine[name] = mine.get(name, 0.0) + t
+
+    def as_dict(self):
+        """
+        Return the counts and timings of SearchStats self, e.g. to export
+        as JSON.
+
+        @type self: SearchStats
+        @rtype: dict[str, object]
+
+        >>> SearchStats().as_dict()["expansions"]
+        0
+        """
+        return {"expansions": self.expansions, "duplicates": self.duplicates,
+                "fail_fast_prunes": self.fail_fast_prunes,
+                "solutions": self.solutions, "max_depth": self.max_depth,
+                "max_frontier": self.max_frontier,
+                "max_visited": self.max_visited,
+                "timings": {cls: dict(seconds)
+                            for cls, seconds in self.timings.items()}}
+
+    def __str__(self):
+        """
+        Return a one-line summary of the counts of SearchStats self.
+
+        @type self: SearchStats
+        @rtype: str
+
+        >>> print(SearchStats())
+        0 expanded, 0 duplicates, 0 pruned, depth 0, frontier 0
+        """
+        return "{} expanded, {} duplicates, {} pruned, depth {}, " \
+               "frontier {}".format(self.expansions, self.duplicates,
+                                    self.fail_fast_prunes, self.max_depth,
+                                    self.max_frontier)
+
+
+class BudgetSpent(Exception):
+    """
+    Raised by SearchBudget.charge when a search has run out of budget,
+    and caught by the search, which then returns a BudgetExceeded.
+    """
+    pass
+
+
+class SearchBudget:
+    """
+    Limits on a search: at most max_nodes expansions, max_seconds of
+    wall time and max_visited configurations remembered as seen, any of
+    which may be None for no limit.  If cancel, such as a
+    threading.Event, is given, the search also stops once
+    cancel.is_set() is True, which another thread may arrange.
+
+    A search given a SearchBudget returns a BudgetExceeded if it runs
+    out, which is also kept as exceeded.  The clock and cancel are
+    checked every _CHECK_INTERVAL expansions, the other limits at
+    every expansion.
+    """
+
+    def __init__(self, max_nodes=None, max_seconds=None, max_visited=None,
+                 cancel=None):
+        """
+        Create a new SearchBudget self.
+
+        @type self: SearchBudget
+        @type max_nodes: int | None
+        @type max_seconds: float | None
+        @type max_visited: int | None
+        @type cancel: threading.Event | None
+        @rtype: None
+        """
+        self.max_nodes, self.max_seconds = max_nodes, max_seconds
+        self.max_visited, self.cancel = max_visited, cancel
+        self.exceeded = None
+        self._last_node, self._deadline = None, None
+
+    def start(self, stats):
+        """
+        Start charging the search updating stats to SearchBudget self,
+        with all of its limits available.
+
+        @type self: SearchBudget
+        @type stats: SearchStats
+        @rtype: None
+        """
+        self.exceeded = None
+        self._last_node = (None if self.max_nodes is None
+                           else stats.expansions + self.max_nodes)
+        self._deadline = (None if self.max_seconds is None
+                          else time.perf_counter() + self.max_seconds)
+        stats.budget = self
+
+    def stop(self, stats):
+        """
+        Stop charging the search updating stats to SearchBudget self.
+
+        @type self: SearchBudget
+        @type stats: SearchStats
+        @rtype: None
+        """
+        stats.budget = None
+
+    def charge(self, stats):
+        """
+        Charge SearchBudget self for the expansion just recorded in
+        stats, raising BudgetSpent if a limit has been passed.
+
+        @type self: SearchBudget
+        @type stats: SearchStats
+        @rtype: None
+
+        >>> stats, budget = SearchStats(), SearchBudget(max_nodes=2)
+        >>> budget.start(stats)
+        >>> stats.expanded("a", 0, 1)
+        >>> stats.expanded("b", 1, 1)
+        >>> stats.expanded("c", 2, 1)
+        Traceback (most recent call last):
+        ...
+        search_stats.BudgetSpent: nodes
+        >>> budget.exceeded.reason, budget.exceeded.stats.expansions
+        ('nodes', 3)
+        """
+        if self._last_node is not None and stats.expansions > self._last_node:
+            self._spend("nodes", stats)
+        if (self.max_visited is not None and
+                stats.max_visited > self.max_visited):
+            self._spend("visited", stats)
+        if stats.expansions % _CHECK_INTERVAL == 0:
+            self.check(stats)
+
+    def check(self, stats):
+        """
+        Raise BudgetSpent if SearchBudget self is out of time or has
+        been cancelled, charging the search updating stats.
+
+        @type self: SearchBudget
+        @type stats: SearchStats
+        @rtype: None
+
+        >>> import threading
+        >>> cancel = threading.Event()
+        >>> stats, budget = SearchStats(), SearchBudget(cancel=cancel)
+        >>> budget.start(stats)
+        >>> budget.check(stats)
+        >>> cancel.set()
+        >>> budget.check(stats)
+        Traceback (most recent call last):
+        ...
+        search_stats.BudgetSpent: cancelled
+        """
+        if self.cancel is not None and self.cancel.is_set():
+            self._spend("cancelled", stats)
+        if self._deadline is not None and time.perf_counter() > self._deadline:
+            self._spend("seconds", stats)
+
+    def _spend(self, reason, stats):
+        # Record that self ran out for reason, then raise BudgetSpent.
+        #
+        # @type self: SearchBudget
+        # @type reason: str
+        # @type stats: SearchStats
+        # @rtype: None
+        self.exceeded = BudgetExceeded(reason, stats)
+        raise BudgetSpent(reason)
+
+
+class BudgetExceeded:
+    """
+    What a search returns instead of a solution when it runs out of its
+    SearchBudget: the reason, one of "nodes", "seconds", "visited" or
+    "cancelled", and the SearchStats of the search so far.
+
+    A BudgetExceeded is false, like None, so "if solution:" treats it as
+    no solution; test "is None" to tell a puzzle with no solution from
+    a search cut short.
+    """
+
+    def __init__(self, reason, stats):
+        """
+        Create a new BudgetExceeded self.
+
+        @type self: BudgetExceeded
+        @type reason: str
+        @type stats: SearchStats
+        @rtype: None
+        """
+        self.reason, self.stats = reason, stats
+
+    def __bool__(self):
+        """
+        Return False: BudgetExceeded self is not a solution.
+
+        @type self: BudgetExceeded
+        @rtype: bool
+        """
+        return False
+
+    def __str__(self):
+        """
+        Return a one-line summary of BudgetExceeded self.
+
+        @type self: BudgetExceeded
+        @rtype: str
+
+        >>> result = BudgetExceeded("seconds", SearchStats())
+        >>> print(result)  # doctest: +ELLIPSIS
+        budget exceeded (seconds) after 0 expanded, ...
+        """
+        return "budget exceeded ({}) after {}".format(self.reason, self.stats)
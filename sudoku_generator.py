@@ -0,0 +1,244 @@
+"""
+Generation of sudoku puzzles with unique solutions, graded by the
+propagation techniques needed to solve them.
+
+Run "python sudoku_generator.py --count 1000" to print a thousand 9x9
+puzzles, one per line with its grade, generated on every core.
+"""
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from sudoku_puzzle import SudokuPuzzle
+import copy
+import random
+
+# grades, easiest first: solved by naked singles alone, also needing
+# hidden singles, and needing search
+GRADES = ("easy", "medium", "hard")
+
+# symbols used when none are given, the first n of them for nxn puzzles
+SYMBOLS = "123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+
+
+def full_grid(n=9, symbol_set=None, rng=random):
+    """
+    Return a random solved nxn SudokuPuzzle over symbol_set, by default
+    the first n of SYMBOLS.
+
+    The subsquares on the diagonal share no row or column, so each is
+    filled with its own random order of the symbols; Dancing Links fills
+    in the rest, and the rows and columns are then shuffled within their
+    bands and stacks, and the bands and stacks among themselves.
+
+    @type n: int
+    @type symbol_set: set[str] | None
+    @type rng: random.Random
+    @rtype: SudokuPuzzle
+
+    >>> grid = full_grid(4, rng=random.Random(0))
+    >>> grid.is_solved()
+    True
+    """
+    symbol_set = set(symbol_set or SYMBOLS[:n])
+    r, order = round(n ** (1 / 2)), sorted(symbol_set)
+    while True:
+        symbols = ["*"] * (n * n)
+        for b in range(r):
+            shuffled = rng.sample(order, n)
+            for k in range(n):
+                symbols[(b * r + k // r) * n + b * r + k % r] = shuffled[k]
+        solved = SudokuPuzzle(n, symbols, symbol_set).exact_cover_solution()
+        if solved is not None:
+            break
+    rows, columns = _shuffled_lines(r, rng), _shuffled_lines(r, rng)
+    key = solved.state_key()
+    return SudokuPuzzle(n, [key[row * n + column] for row in rows
+                            for column in columns], symbol_set)
+
+
+def remove_clues(solution, rng=random, min_clues=0):
+    """
+    Return a SudokuPuzzle with solution, a solved SudokuPuzzle, as its
+    only solution, and as few clues as removing them one at a time in
+    random order allows, keeping at least min_clues.
+
+    A clue stays if the puzzle without it would have a second solution.
+    The puzzle with it has only one, so any other must put a different
+    symbol at its position, and a search for one stops at the first it
+    finds.  No search is needed for a clue that the others still force,
+    as the only symbol allowed at its position.  Removing clues down to
+    a minimal puzzle can take many seconds for 16x16 and larger grids,
+    so min_clues is worth setting for them.
+
+    @type solution: SudokuPuzzle
+    @type rng: random.Random
+    @type min_clues: int
+    @rtype: SudokuPuzzle
+
+    >>> puzzle = remove_clues(full_grid(4, rng=random.Random(0)),
+    ...                       random.Random(0))
+    >>> puzzle.count_solutions()
+    1
+    """
+    key = solution.state_key()
+    puzzle, clues = copy.copy(solution), len(key)
+    for i in rng.sample(range(len(key)), len(key)):
+        if clues <= min_clues:
+            break
+        puzzle.undo((i, key[i]))
+        if (len(puzzle.allowed(i)) == 1 or
+                puzzle.count_solutions(1, without=(i, key[i])) == 0):
+            clues -= 1
+        else:
+            puzzle.apply((i, key[i]))
+    return puzzle
+
+
+def grade(puzzle):
+    """
+    Return the grade in GRADES of SudokuPuzzle puzzle: "easy" if naked
+    singles alone solve it, "medium" if it also needs hidden singles,
+    and "hard" if it needs search.
+
+    @type puzzle: SudokuPuzzle
+    @rtype: str
+
+    >>> grid = ["*", "B", "C", "D"]
+    >>> grid += ["C", "D", "*", "B"]
+    >>> grid += ["B", "A", "D", "C"]
+    >>> grid += ["D", "C", "B", "*"]
+    >>> grade(SudokuPuzzle(4, grid, {"A", "B", "C", "D"}))
+    'easy'
+    """
+    techniques = puzzle.techniques() or ["search"]
+    if "search" in techniques:
+        return "hard"
+    return "medium" if "hidden single" in techniques else "easy"
+
+
+def generate(n=9, symbol_set=None, grades=None, rng=random, min_clues=0):
+    """
+    Return a new nxn SudokuPuzzle with a unique solution and at least
+    min_clues clues, and its grade, generating until the grade is one of
+    grades if they are given.
+
+    @type n: int
+    @type symbol_set: set[str] | None
+    @type grades: collection[str] | None
+    @type rng: random.Random
+    @type min_clues: int
+    @rtype: (SudokuPuzzle, str)
+
+    >>> puzzle, found = generate(4, grades=["easy"], rng=random.Random(1))
+    >>> found, puzzle.count_solutions()
+    ('easy', 1)
+    """
+    while True:
+        puzzle = remove_clues(full_grid(n, symbol_set, rng), rng, min_clues)
+        found = grade(puzzle)
+        if grades is None or found in grades:
+            return puzzle, found
+
+
+def generate_many(count, n=9, symbol_set=None, grades=None, min_clues=0,
+                  workers=None, seed=None, chunksize=16):
+    """
+    Yield count new (SudokuPuzzle, grade) pairs as generate would,
+    generated chunksize at a time spread over worker processes.
+
+    Each chunk has its own random generator, seeded from seed and the
+    position of the chunk, so a given seed gives the same puzzles, in
+    the same order, however many workers there are.
+
+    @type count: int
+    @type n: int
+    @type symbol_set: set[str] | None
+    @type grades: collection[str] | None
+    @type min_clues: int
+    @type workers: int | None
+                   the number of processes; None for one per CPU
+    @type seed: int | None
+    @type chunksize: int
+    @rtype: Iterator[(SudokuPuzzle, str)]
+
+    >>> runs = [list(generate_many(3, 4, seed=5, workers=w, chunksize=2))
+    ...         for w in (1, 2)]
+    >>> [p.state_key() for p, _ in runs[0]] == [p.state_key()
+    ...                                         for p, _ in runs[1]]
+    True
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    sizes = [min(chunksize, count - start)
+             for start in range(0, count, chunksize)]
+    grades = None if grades is None else list(grades)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_generate_chunk, size, n, symbol_set,
+                                   grades, min_clues, (seed, c))
+                   for c, size in enumerate(sizes)]
+        # chunks finished but waiting for earlier ones, by position
+        waiting, next_chunk = {}, 0
+        position = {future: c for c, future in enumerate(futures)}
+        for future in as_completed(futures):
+            waiting[position[future]] = future.result()
+            while next_chunk in waiting:
+                for generated in waiting.pop(next_chunk):
+                    yield generated
+                next_chunk += 1
+
+
+def _generate_chunk(size, n, symbol_set, grades, min_clues, seed):
+    # Return a list of size (SudokuPuzzle, grade) pairs from generate,
+    # drawing on a random generator seeded with seed.
+    #
+    # @type size: int
+    # @type n: int
+    # @type symbol_set: set[str] | None
+    # @type grades: list[str] | None
+    # @type min_clues: int
+    # @type seed: (int, int)
+    # @rtype: list[(SudokuPuzzle, str)]
+    rng = random.Random("{}-{}".format(*seed))
+    return [generate(n, symbol_set, grades, rng, min_clues)
+            for _ in range(size)]
+
+
+def _shuffled_lines(r, rng):
+    # Return the rows (or columns) of an (r*r)x(r*r) grid shuffled within
+    # their bands (or stacks), and the bands among themselves.
+    #
+    # @type r: int
+    # @type rng: random.Random
+    # @rtype: list[int]
+    return [band * r + k for band in rng.sample(range(r), r)
+            for k in rng.sample(range(r), r)]
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+
+    parser = argparse.ArgumentParser(
+        description="Generate sudoku puzzles with unique solutions, one "
+                    "per line with its grade.")
+    parser.add_argument("--count", type=int, default=1)
+    parser.add_argument("-n", type=int, default=9,
+                        help="the size of the grid, a square such as 4, "
+                             "9 or 16")
+    parser.add_argument("--grade", action="append", choices=GRADES,
+                        help="a grade to keep; any grade by default")
+    parser.add_argument("--min-clues", type=int, default=0,
+                        help="clues to keep at least, to generate large "
+                             "grids sooner")
+    parser.add_argument("--workers", type=int,
+                        help="the number of processes; one per CPU by "
+                             "default")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+    start = time.perf_counter()
+    for puzzle, found in generate_many(args.count, args.n, grades=args.grade,
+                                       min_clues=args.min_clues,
+                                       workers=args.workers, seed=args.seed):
+        print(puzzle.state_key(), found)
+    seconds = time.perf_counter() - start
+    print("{} puzzles in {:.2f} seconds, {:.0f} per minute".format(
+        args.count, seconds, args.count * 60 / seconds), file=sys.stderr)
@@ -1,27 +1,57 @@
+from dancing_links import DancingLinks
 from puzzle import Puzzle
+import itertools
 import math
+import random
 
 class SudokuPuzzle(Puzzle):
     """
     A sudoku puzzle that may be solved, unsolved, or even unsolvable.
     """
 
-    def __init__(self, n, symbols, symbol_set):
+    def __init__(self, n, symbols, symbol_set, propagate=False):
         """
         Create a new nxn SudokuPuzzle self with symbols
         from symbol_set already selected.
 
+        If propagate is True, every extension of self (and of its
+        extensions) also fills in each cell forced by naked or hidden
+        singles, and extensions found to be contradictory are dropped.
+
         @type self: SudokuPuzzle
         @type n: int
         @type symbols: list[str]
         @type symbol_set: set[str]
+        @type propagate: bool
         """
         assert n > 0
         assert round(n ** (1 / 2)) * round(n ** (1 / 2)) == n
         assert all([d in (symbol_set | {"*"}) for d in symbols])
         assert len(symbol_set) == n
         assert len(symbols) == n ** 2
-        self._n, self._symbols, self._symbol_set = n, symbols, symbol_set
+        # symbols is copied, as moves change self's symbols in place
+        self._n, self._symbol_set = n, symbol_set
+        self._symbols = list(symbols)
+        self._propagate = propagate
+        # positions filled in since the configuration self extends, which
+        # fail_fast checks were all it changed, or None if there is none
+        self._placed = None
+        # the orders canonical_key reads positions in, found on its first
+        # call and shared by every configuration reached from self
+        self._orders = None
+        # bitmasks of the symbols already used in each row, column and
+        # subsquare, one bit per symbol as given by the layout
+        self._layout = _layout(n, symbol_set)
+        bits, layout = self._layout.bits, self._layout
+        self._rows, self._columns, self._boxes = [0] * n, [0] * n, [0] * n
+        for i, d in enumerate(symbols):
+            if d != "*":
+                self._rows[layout.row[i]] |= bits[d]
+                self._columns[layout.column[i]] |= bits[d]
+                self._boxes[layout.box[i]] |= bits[d]
+        # Zobrist hash of the symbols, updated as positions are filled
+        # and emptied
+        self._hash = layout.hash(symbols)
 
     def __eq__(self, other):
         """
@@ -55,6 +85,153 @@ class SudokuPuzzle(Puzzle):
                 self._n == other._n and self._symbols == other._symbols and
                 self._symbol_set == other._symbol_set)
 
+    __hash__ = Puzzle.__hash__
+
+    def __reduce__(self):
+        """
+        Return how to rebuild SudokuPuzzle self when it is unpickled,
+        such as when sent to or from a worker process.  Only the symbols,
+        the symbol set and whether it propagates are sent; the used-symbol
+        masks are recomputed, and the unit and Zobrist tables for n and
+        the symbol set are rebuilt or reused.
+
+        @type self: SudokuPuzzle
+        @rtype: tuple
+        """
+        return SudokuPuzzle, (self._n, self._symbols[:], self._symbol_set,
+                              self._propagate)
+
+    def state_key(self):
+        """
+        Return the symbols of SudokuPuzzle self read row by row, "*" for
+        empty: packed into one string if every symbol is one character,
+        and otherwise as their codes, 1, 2, ... in symbol order with 0
+        for "*", packed as by canonical_key.
+
+        @type self: SudokuPuzzle
+        @rtype: str | bytes | tuple[int]
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> grid += ["*", "D", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> SudokuPuzzle(4, grid, {"A", "B", "C", "D"}).state_key()
+        'ABCDDCBA*D******'
+        >>> symbol_set = {str(k) for k in range(1, 17)}
+        >>> first = ["1", "12"] + ["*"] * 254
+        >>> second = ["11", "2"] + ["*"] * 254
+        >>> (SudokuPuzzle(16, first, symbol_set).state_key() ==
+        ...  SudokuPuzzle(16, second, symbol_set).state_key())
+        False
+        """
+        layout = self._layout
+        if layout.codes is None:
+            return "".join(self._symbols)
+        codes = layout.codes
+        return layout.pack([codes[d] for d in self._symbols])
+
+    def state_hash(self):
+        """
+        Return the Zobrist hash of the symbols of SudokuPuzzle self: the
+        exclusive or of a fixed random number for each symbol at its
+        position, kept up to date as positions are filled and emptied.
+
+        @type self: SudokuPuzzle
+        @rtype: int
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> grid += ["*", "D", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> s.apply((10, "A"))
+        >>> s.state_hash() == SudokuPuzzle(4, list(s.state_key()),
+        ...                                {"A", "B", "C", "D"}).state_hash()
+        True
+        """
+        return self._hash
+
+    def canonical_key(self):
+        """
+        Return the smallest key among the configurations equivalent to
+        SudokuPuzzle self under transposing, reordering its bands of
+        rows and stacks of columns, and renaming its symbols.
+
+        Symbols are renamed 1, 2, ... in order of first appearance, with
+        0 for "*".  For n above 16 there are too many orders of bands and
+        stacks to try, so only transposing and renaming are used.
+
+        Only the orders under which the first configuration keyed, and
+        every configuration reached from it, reads the same as it does
+        row by row, up to renaming, are tried; the others can rarely make
+        two configurations of one search equivalent.  Givens usually rule
+        out every order but row by row, and if they also use all the
+        symbols but one, renaming can't make two configurations
+        equivalent either, and the key is just the state_key.  Otherwise
+        the key costs a pass over the grid for each order left.
+
+        @type self: SudokuPuzzle
+        @rtype: str | bytes | tuple[int]
+
+        >>> empty = SudokuPuzzle(4, ["*"] * 16, {"A", "B", "C", "D"})
+        >>> key = empty.canonical_key()
+        >>> s1, s2 = empty.__copy__(), empty.__copy__()
+        >>> s1.apply((0, "A"))
+        >>> s2.apply((10, "B"))
+        >>> s1.canonical_key() == s2.canonical_key()
+        True
+        >>> grid = ["A", "B", "C", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> s.canonical_key() == s.state_key()
+        True
+        """
+        if self._orders is None:
+            self._orders = self._symmetric_orders()
+        if not self._orders:
+            return self.state_key()
+        best = None
+        for order in self._orders:
+            key = self._renamed(order)
+            if best is None or key < best:
+                best = key
+        return best
+
+    def _symmetric_orders(self):
+        # Return the orders of positions in _Layout.symmetric_orders that
+        # read self the same as row by row does, up to renaming symbols,
+        # or [] if that is only row by row and self already uses all
+        # the symbols but one.
+        #
+        # @type self: SudokuPuzzle
+        # @rtype: list[list[int]]
+        orders = self._layout.symmetric_orders()
+        # the first order is row by row
+        rows = self._renamed(orders[0])
+        kept = [order for order in orders if self._renamed(order) == rows]
+        used = len(set(self._symbols) - {"*"})
+        if len(kept) == 1 and used >= self._n - 1:
+            return []
+        return kept
+
+    def _renamed(self, order):
+        # Return the symbols of self read in order, renamed 1, 2, ... in
+        # order of first appearance with 0 for "*", packed as by
+        # canonical_key.
+        #
+        # @type self: SudokuPuzzle
+        # @type order: list[int]
+        # @rtype: bytes | tuple[int]
+        symbols, labels, key = self._symbols, {"*": 0}, []
+        for i in order:
+            d = symbols[i]
+            if d not in labels:
+                labels[d] = len(labels)
+            key.append(labels[d])
+        return self._layout.pack(key)
+
     def __str__(self):
         """
         Return a human-readable string representation of SudokuPuzzle self.
@@ -131,14 +308,124 @@ class SudokuPuzzle(Puzzle):
         >>> s.is_solved()
         False
         """
-        # convenient names
-        n, symbols = self._n, self._symbols
-        # no "*" left and all rows, column, subsquares have correct symbols
-        return ("*" not in symbols and
-                all([(self._row_set(i) == self._symbol_set and
-                      self._column_set(i) == self._symbol_set and
-                      self._subsquare_set(i) ==
-                      self._symbol_set) for i in range(n ** 2)]))
+        # no "*" left and all rows, column, subsquares have correct symbols;
+        # n filled cells use all n symbols exactly when none is repeated
+        full = self._layout.full
+        return ("*" not in self._symbols and
+                all([m == full for m in self._rows]) and
+                all([m == full for m in self._columns]) and
+                all([m == full for m in self._boxes]))
+
+    def exact_cover_solution(self):
+        """
+        Return a solved SudokuPuzzle filling in the empty positions of
+        SudokuPuzzle self, or None if there is none.
+
+        The rules are posed as an exact cover problem, each position
+        and each symbol in each row, column and subsquare to be covered
+        exactly once, and solved by Dancing Links.  This is much faster
+        than searching extensions for puzzles larger than 9x9.
+
+        @type self: SudokuPuzzle
+        @rtype: SudokuPuzzle | None
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> grid += ["*", "D", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> print(s.exact_cover_solution())
+        AB|CD
+        DC|BA
+        -----
+        BD|AC
+        CA|DB
+        >>> grid[14] = "A"
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> s.exact_cover_solution() is None
+        True
+        """
+        links, placements = self._exact_cover()
+        rows = next(links.solutions(), None) if links else None
+        if rows is None:
+            return None
+        solved = self.__copy__()
+        for r in rows:
+            solved._fill(*placements[r])
+        solved._placed = None
+        return solved
+
+    def count_solutions(self, limit=None, without=None):
+        """
+        Return the number of ways to fill in the empty positions of
+        SudokuPuzzle self, counting no further than limit if it is given;
+        a limit of 2 is enough to tell whether the solution is unique.
+        If without is given, as (position, symbol), only the ways not
+        putting that symbol at that position are counted.
+
+        @type self: SudokuPuzzle
+        @type limit: int | None
+        @type without: (int, str) | None
+        @rtype: int
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["C", "D", "A", "B"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> s.count_solutions(), s.count_solutions(limit=2)
+        (4, 2)
+        >>> s.count_solutions(without=(8, "B"))
+        2
+        """
+        links, _ = self._exact_cover(without)
+        return links.count(limit) if links else 0
+
+    def _exact_cover(self, without=None):
+        # Return a DancingLinks whose exact covers are the ways to fill in
+        # the empty positions of self, other than by placing without, and
+        # the (position, symbol) placed by each of its rows; or (None,
+        # None) if a symbol is already repeated in some row, column or
+        # subsquare.
+        #
+        # @type self: SudokuPuzzle
+        # @type without: (int, str) | None
+        # @rtype: (DancingLinks, list[(int, str)]) | (None, None)
+        n, layout, symbols = self._n, self._layout, self._symbols
+        units = ((layout.rows, self._rows), (layout.columns, self._columns),
+                 (layout.boxes, self._boxes))
+        for positions, masks in units:
+            for u, mask in enumerate(masks):
+                filled = sum([symbols[i] != "*" for i in positions[u]])
+                if filled != bin(mask).count("1"):
+                    return None, None
+        # columns of the problem, numbered only for the constraints not
+        # met yet: each empty position, then each symbol missing from
+        # each row, each column and each subsquare
+        slot, columns = [-1] * (4 * n * n), 0
+        for i, d in enumerate(symbols):
+            if d == "*":
+                slot[i], columns = columns, columns + 1
+        for t, (_, masks) in enumerate(units, 1):
+            for u, mask in enumerate(masks):
+                for k in range(n):
+                    if not mask >> k & 1:
+                        slot[(t * n + u) * n + k] = columns
+                        columns += 1
+        rows, placements = [], []
+        for i, d in enumerate(symbols):
+            if d == "*":
+                allowed = self._candidates(i)
+                if without is not None and without[0] == i:
+                    allowed &= ~layout.bits[without[1]]
+                for k in range(n):
+                    if allowed >> k & 1:
+                        rows.append([slot[i],
+                                     slot[(n + layout.row[i]) * n + k],
+                                     slot[(2 * n + layout.column[i]) * n + k],
+                                     slot[(3 * n + layout.box[i]) * n + k]])
+                        placements.append((i, layout.symbol_of[1 << k]))
+        return DancingLinks(columns, rows), placements
 
     def extensions(self):
         """
@@ -161,30 +448,269 @@ class SudokuPuzzle(Puzzle):
         True
         >>> all([s in L1 for s in L2])
         True
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> grid += ["*", "D", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"}, propagate=True)
+        >>> print(s.extensions()[0])
+        AB|CD
+        DC|BA
+        -----
+        *D|A*
+        *A|D*
+        """
+        extensions = []
+        for i, d in self.moves():
+            child = self._place(i, d)
+            if not self._propagate or child._propagated():
+                extensions.append(child)
+        return extensions
+
+    def moves(self):
+        """
+        Return list of the moves of SudokuPuzzle self: (position, symbol)
+        for each symbol allowed at the empty position with the fewest.
+
+        Moves place a single symbol; unlike extensions, they never fill
+        in further positions, even when self propagates.
+
+        @type self: SudokuPuzzle
+        @rtype: list[(int, str)]
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> grid += ["*", "D", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> SudokuPuzzle(4, grid, {"A", "B", "C", "D"}).moves()
+        [(10, 'A')]
+        """
+        if "*" not in self._symbols:
+            return []
+        # branch on the empty position with the fewest allowed symbols
+        i, allowed = self._most_constrained()
+        return [(i, d) for d in self._layout.symbols_in(allowed)]
+
+    def apply(self, move):
+        """
+        Put the symbol of move at its position in SudokuPuzzle self.
+
+        @type self: SudokuPuzzle
+        @type move: (int, str)
+        @rtype: None
+        """
+        self._fill(*move)
+        self._placed = (move[0],)
+
+    def undo(self, move):
+        """
+        Empty the position of move in SudokuPuzzle self again.
+
+        @type self: SudokuPuzzle
+        @type move: (int, str)
+        @rtype: None
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> grid += ["*", "D", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> before = (s.state_key(), s.moves())
+        >>> s.apply((10, "A"))
+        >>> s.state_key(), "".join(grid)
+        ('ABCDDCBA*DA*****', 'ABCDDCBA*D******')
+        >>> s.undo((10, "A"))
+        >>> (s.state_key(), s.moves()) == before
+        True
+        """
+        i, d = move
+        layout = self._layout
+        keep = ~layout.bits[d]
+        self._symbols[i] = "*"
+        self._placed = None
+        self._hash ^= layout.zobrist[d][i]
+        self._rows[layout.row[i]] &= keep
+        self._columns[layout.column[i]] &= keep
+        self._boxes[layout.box[i]] &= keep
+
+    def __copy__(self):
+        """
+        Return a new SudokuPuzzle with the configuration of SudokuPuzzle
+        self, sharing only its fixed tables.
+
+        @type self: SudokuPuzzle
+        @rtype: SudokuPuzzle
+        """
+        child = SudokuPuzzle.__new__(SudokuPuzzle)
+        child._n, child._symbol_set = self._n, self._symbol_set
+        child._propagate, child._layout = self._propagate, self._layout
+        child._placed, child._hash = self._placed, self._hash
+        child._orders = self._orders
+        child._symbols = self._symbols[:]
+        child._rows = self._rows[:]
+        child._columns = self._columns[:]
+        child._boxes = self._boxes[:]
+        return child
+
+    def _most_constrained(self):
+        # Return an empty position of self with the fewest allowed
+        # symbols, and the bitmask of those symbols.
+        #
+        # @type self: SudokuPuzzle
+        # @rtype: (int, int)
+        best, best_allowed, best_count = None, 0, self._n + 1
+        for i, d in enumerate(self._symbols):
+            if d == "*":
+                allowed = self._candidates(i)
+                count = bin(allowed).count("1")
+                if count < best_count:
+                    best, best_allowed, best_count = i, allowed, count
+                    if count <= 1:
+                        break
+        return best, best_allowed
+
+    def techniques(self):
         """
-        # convenient names
-        symbols, symbol_set, n = self._symbols, self._symbol_set, self._n
-        if "*" not in symbols:
-            # return an empty list
-            return [_ for _ in []]
-        else:
-            # position of first empty position
-            i = symbols.index("*")
-            # allowed symbols at position i
-            # A | B == A.union(B)
-            allowed_symbols = (self._symbol_set -
-                               (self._row_set(i) |
-                                self._column_set(i) |
-                                self._subsquare_set(i)))
-            # list of SudokuPuzzles with each legal digit at position i
-            return (
-                [SudokuPuzzle(n,
-                 symbols[:i] + [d] + symbols[i + 1:], symbol_set)
-                 for d in allowed_symbols])
+        Return the propagation techniques needed to fill in SudokuPuzzle
+        self, in the order first needed: "naked single" (one symbol
+        allowed at a position), "hidden single" (one position allowed for
+        a symbol in a row, column or subsquare), and "search" if they
+        leave it unfinished.  Naked singles are always tried first.
+        Return None if they show that self can't be solved.
+
+        @type self: SudokuPuzzle
+        @rtype: list[str] | None
+
+        >>> grid = ["*", "B", "C", "D"]
+        >>> grid += ["C", "D", "*", "B"]
+        >>> grid += ["B", "A", "D", "C"]
+        >>> grid += ["D", "C", "B", "*"]
+        >>> SudokuPuzzle(4, grid, {"A", "B", "C", "D"}).techniques()
+        ['naked single']
+        >>> grid = ["*"] * 16
+        >>> SudokuPuzzle(4, grid, {"A", "B", "C", "D"}).techniques()
+        ['search']
+        """
+        puzzle, needed = self.__copy__(), []
+        while "*" in puzzle._symbols:
+            filled = puzzle._naked_singles()
+            technique = "naked single"
+            if filled == 0:
+                filled = puzzle._hidden_singles()
+                technique = "hidden single"
+            if filled is None:
+                return None
+            if filled == 0:
+                needed.append("search")
+                break
+            if technique not in needed:
+                needed.append(technique)
+        return needed
+
+    def allowed(self, i):
+        """
+        Return the symbols, in order, allowed at the empty position i of
+        SudokuPuzzle self by the symbols in its row, column and subsquare.
+
+        @type self: SudokuPuzzle
+        @type i: int
+        @rtype: list[str]
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> grid += ["*", "D", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> s.allowed(8), s.allowed(10)
+        (['B', 'C'], ['A'])
+        """
+        return self._layout.symbols_in(self._candidates(i))
+
+    def _propagated(self):
+        # Fill in, in place, every empty position of self forced by a
+        # naked single or a hidden single, until none is left.  Return
+        # False iff this shows that self can't be solved.
+        #
+        # @type self: SudokuPuzzle
+        # @rtype: bool
+        while True:
+            naked = self._naked_singles()
+            hidden = None if naked is None else self._hidden_singles()
+            if hidden is None:
+                return False
+            if naked == hidden == 0:
+                # these last passes have checked all of self
+                self._placed = ()
+                return True
+
+    def _naked_singles(self):
+        # Fill in, in place, each empty position of self where only one
+        # symbol is allowed, in one pass over the positions.  Return how
+        # many were filled in, or None if some empty position has no
+        # symbol allowed.
+        #
+        # @type self: SudokuPuzzle
+        # @rtype: int | None
+        layout, symbols, filled = self._layout, self._symbols, 0
+        for i in range(len(symbols)):
+            if symbols[i] == "*":
+                allowed = self._candidates(i)
+                if allowed == 0:
+                    return None
+                if allowed & (allowed - 1) == 0:
+                    self._fill(i, layout.symbol_of[allowed])
+                    filled += 1
+        return filled
+
+    def _hidden_singles(self):
+        # Fill in, in place, each symbol of self allowed at only one empty
+        # position of a row, column or subsquare, in one pass over them.
+        # Return how many were filled in, or None if some symbol missing
+        # from a unit is allowed nowhere in it.
+        #
+        # @type self: SudokuPuzzle
+        # @rtype: int | None
+        layout, symbols, filled = self._layout, self._symbols, 0
+        for used, units in ((self._rows, layout.rows),
+                            (self._columns, layout.columns),
+                            (self._boxes, layout.boxes)):
+            for u, cells in enumerate(units):
+                # symbols allowed at one or more, and two or more, of the
+                # empty positions of this unit
+                once = twice = 0
+                for i in cells:
+                    if symbols[i] == "*":
+                        allowed = self._candidates(i)
+                        twice |= once & allowed
+                        once |= allowed
+                missing = layout.full & ~used[u]
+                if missing & ~once:
+                    return None
+                singles = missing & once & ~twice
+                while singles:
+                    bit = singles & -singles
+                    singles ^= bit
+                    places = [i for i in cells if symbols[i] == "*" and
+                              self._candidates(i) & bit]
+                    if not places:
+                        return None
+                    self._fill(places[0], layout.symbol_of[bit])
+                    filled += 1
+        return filled
 
     def fail_fast(self):
         """
-        Return True if a Sudoku puzzle cannot be solved
+        Return True iff SudokuPuzzle self can't be solved because an empty
+        position has no symbol allowed, or a symbol missing from a row,
+        column or subsquare is allowed at none of its empty positions.
+
+        When self is an extension of, or has just had a move applied to,
+        a configuration already checked, as in a search, only the rows,
+        columns and subsquares the new symbol can have changed are
+        checked; otherwise every one is.
+
+        @type self: SudokuPuzzle
+        @rtype: bool
 
         >>> grid = ["A", "B", "*", "D"]
         >>> grid += ["*", "D", "A", "B"]
@@ -193,67 +719,249 @@ class SudokuPuzzle(Puzzle):
         >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
         >>> s.fail_fast()
         False
+        >>> grid = ["A", "B", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> s.fail_fast()
+        False
+        >>> s.apply((10, "A"))
+        >>> s.fail_fast()
+        False
+        >>> s.undo((10, "A"))
+        >>> s.apply((6, "C"))
+        >>> s.fail_fast()
+        True
         """
-        symbols, symbol_set, n = self._symbols, self._symbol_set, self._n
-        if self.is_solved:
-             return False
-        else:
-            i = symbols.index("*")
-            allowed_symbols = (self._symbol_set -
-                                        (self._row_set(i) |
-                                         self._column_set(i) |
-                                         self._subsquare_set(i)))
-            if allowed_symbols not in symbol_set:
-                return True
+        layout, symbols = self._layout, self._symbols
+        rows, columns, boxes = self._rows, self._columns, self._boxes
+        units = ((layout.rows, layout.row, rows),
+                 (layout.columns, layout.column, columns),
+                 (layout.boxes, layout.box, boxes))
+        if self._placed is None:
+            return any([self._unit_dead(cells[u], used[u])
+                        for cells, _, used in units
+                        for u in range(self._n)])
+        row, column, box = layout.row, layout.column, layout.box
+        for i in self._placed:
+            bit = layout.bits[symbols[i]]
+            # the units of i have lost i as a place for their other
+            # missing symbols, and its empty peers have lost a symbol
+            for cells, of, used in units:
+                if self._unit_dead(cells[of[i]], used[of[i]]):
+                    return True
+            # units other than those of i, but with an empty peer of i,
+            # may have lost their last place for the symbol now at i
+            for cells, of, used in units:
+                checked = {of[i]}
+                for peers, peer_of, _ in units:
+                    if peers is cells:
+                        continue
+                    for j in peers[peer_of[i]]:
+                        u = of[j]
+                        if u in checked or symbols[j] != "*":
+                            continue
+                        checked.add(u)
+                        if used[u] & bit:
+                            continue
+                        for k in cells[u]:
+                            if symbols[k] == "*" and not (
+                                    rows[row[k]] | columns[column[k]] |
+                                    boxes[box[k]]) & bit:
+                                break
+                        else:
+                            return True
+        return False
 
-    def _row_set(self, m):
+    def _unit_dead(self, cells, used):
+        # Return True iff some empty position among cells, those of a row,
+        # column or subsquare of self already using the symbols in
+        # bitmask used, has no symbol allowed, or some symbol missing
+        # from them is allowed at none of them.
         #
-        # Return set of symbols in row of SudokuPuzzle self's symbols
-        # where position m occurs.
+        # @type self: SudokuPuzzle
+        # @type cells: list[int]
+        # @type used: int
+        # @rtype: bool
+        layout, symbols = self._layout, self._symbols
+        row, column, box = layout.row, layout.column, layout.box
+        rows, columns, boxes = self._rows, self._columns, self._boxes
+        full, allowed_somewhere = layout.full, 0
+        for i in cells:
+            if symbols[i] == "*":
+                allowed = full & ~(rows[row[i]] | columns[column[i]] |
+                                   boxes[box[i]])
+                if allowed == 0:
+                    return True
+                allowed_somewhere |= allowed
+        return full & ~used & ~allowed_somewhere != 0
+
+    def _place(self, i, d):
+        # Return a new SudokuPuzzle like self, but with symbol d at
+        # the empty position i; the used-symbol masks are updated
+        # rather than recomputed.
         #
         # @type self: SudokuPuzzle
-        # @type m: int
-        assert 0 <= m < self._n ** 2
-        # convenient names
-        n, symbols = self._n, self._symbols
-        # first position in m's row
-        r = (m // n) * n
-        # set of elements from symbols[r] .. symbols[r+n-1]
-        return set([symbols[r + i] for i in range(n)])
-
-    def _column_set(self, m):
-        # Return set of symbols in column of SudokuPuzzle self's symbols
-        # where position m occurs.
+        # @type i: int
+        # @type d: str
+        # @rtype: SudokuPuzzle
+        child = self.__copy__()
+        child._fill(i, d)
+        child._placed = (i,)
+        return child
+
+    def _fill(self, i, d):
+        # Put symbol d at the empty position i of self, in place.
         #
         # @type self: SudokuPuzzle
-        # @type m: int
-        assert 0 <= m <= self._n ** 2
-        # convenient names
-        symbols, n = self._symbols, self._n
-        # first position in m's column
-        c = m % n
-        # set of elements from symbols[c], symbols[c + n],
-        # ... symbols[c + (n * (n-1))]
-        return set([symbols[c + (i * n)] for i in range(n)])
-
-    def _subsquare_set(self, m):
-        # Return set of symbols in subsquare of SudokuPuzzle self's symbols
-        # where position m occurs.
+        # @type i: int
+        # @type d: str
+        # @rtype: None
+        layout = self._layout
+        bit = layout.bits[d]
+        self._symbols[i] = d
+        self._hash ^= layout.zobrist[d][i]
+        self._rows[layout.row[i]] |= bit
+        self._columns[layout.column[i]] |= bit
+        self._boxes[layout.box[i]] |= bit
+
+    def _candidates(self, i):
+        # Return the bitmask of symbols allowed at position i of self
+        # by its row, column and subsquare.
         #
         # @type self: SudokuPuzzle
-        # @type m: int
-        assert 0 <= m < self._n ** 2
-        # convenient names
-        n, symbols = self._n, self._symbols
-        # row, column where m occur
-        row, col = m // n, m % n
-        # length of subsquares
-        ss = round(n ** (1 / 2))
-        # upper-left position of m's subsquare
-        ul = (((row // ss) * ss) * n) + ((col // ss) * ss)
-        # return set of symbols from subsquare starting at ul
-        return set(
-            [symbols[ul + i + n * j] for i in range(ss) for j in range(ss)])
+        # @type i: int
+        # @rtype: int
+        layout = self._layout
+        return layout.full & ~(self._rows[layout.row[i]] |
+                               self._columns[layout.column[i]] |
+                               self._boxes[layout.box[i]])
+
+
+class _Layout:
+    """
+    Tables shared by every nxn SudokuPuzzle over the same symbol_set.
+    """
+
+    def __init__(self, n, symbols):
+        """
+        Create the tables for nxn puzzles over symbols, given in order.
+
+        @type self: _Layout
+        @type n: int
+        @type symbols: tuple[str]
+        @rtype: None
+        """
+        r = round(n ** (1 / 2))
+        # one bit per symbol, and back again
+        self.bits = {d: 1 << k for k, d in enumerate(symbols)}
+        self.symbol_of = {bit: d for d, bit in self.bits.items()}
+        # the code of each symbol in state_keys, or None if symbols are
+        # single characters, which are joined instead
+        self.codes = None
+        if any(len(d) != 1 for d in symbols):
+            self.codes = {d: k + 1 for k, d in enumerate(symbols)}
+            self.codes["*"] = 0
+        self.full = (1 << n) - 1
+        # row, column and subsquare of each position
+        self.row = [i // n for i in range(n ** 2)]
+        self.column = [i % n for i in range(n ** 2)]
+        self.box = [(i // n // r) * r + (i % n) // r for i in range(n ** 2)]
+        # positions in each row, column and subsquare
+        self.rows = [[i for i in range(n ** 2) if self.row[i] == u]
+                     for u in range(n)]
+        self.columns = [[i for i in range(n ** 2) if self.column[i] == u]
+                        for u in range(n)]
+        self.boxes = [[i for i in range(n ** 2) if self.box[i] == u]
+                      for u in range(n)]
+        self.pack = bytes if n < 256 else tuple
+        # a random number for each symbol at each position, seeded by n
+        # and the symbols so hashes agree between processes
+        rng = random.Random("{}:{}".format(n, "".join(symbols)))
+        self.zobrist = {d: [rng.getrandbits(64) for _ in range(n ** 2)]
+                        for d in symbols}
+        self._n, self._orders = n, None
+
+    def hash(self, symbols):
+        """
+        Return the Zobrist hash of symbols, "*" for empty positions, as
+        SudokuPuzzle.state_hash gives it.
+
+        @type self: _Layout
+        @type symbols: list[str]
+        @rtype: int
+        """
+        h = 0
+        for i, d in enumerate(symbols):
+            if d != "*":
+                h ^= self.zobrist[d][i]
+        return h
+
+    def symmetric_orders(self):
+        """
+        Return, for each transposition and reordering of bands and
+        stacks tried by SudokuPuzzle.canonical_key, the order in which
+        it reads the positions of a puzzle.  These are found on first use.
+
+        @type self: _Layout
+        @rtype: list[list[int]]
+        """
+        if self._orders is None:
+            n = self._n
+            r = round(n ** (1 / 2))
+            if n <= 16:
+                groups = list(itertools.permutations(range(r)))
+            else:
+                groups = [tuple(range(r))]
+            self._orders = []
+            for transpose in (False, True):
+                for bands in groups:
+                    for stacks in groups:
+                        rows = [b * r + k for b in bands for k in range(r)]
+                        columns = [s * r + k for s in stacks
+                                   for k in range(r)]
+                        if transpose:
+                            self._orders.append([row * n + column
+                                                 for column in columns
+                                                 for row in rows])
+                        else:
+                            self._orders.append([row * n + column
+                                                 for row in rows
+                                                 for column in columns])
+        return self._orders
+
+    def symbols_in(self, mask):
+        """
+        Return the symbols whose bits are set in mask, in symbol order.
+
+        @type self: _Layout
+        @type mask: int
+        @rtype: list[str]
+        """
+        found = []
+        while mask:
+            bit = mask & -mask
+            mask ^= bit
+            found.append(self.symbol_of[bit])
+        return found
+
+
+# layouts already built, by (n, sorted symbols)
+_LAYOUTS = {}
+
+
+def _layout(n, symbol_set):
+    # Return the _Layout for nxn puzzles over symbol_set, building it
+    # only the first time they are seen.
+    #
+    # @type n: int
+    # @type symbol_set: set[str]
+    # @rtype: _Layout
+    key = (n, tuple(sorted(symbol_set)))
+    if key not in _LAYOUTS:
+        _LAYOUTS[key] = _Layout(*key)
+    return _LAYOUTS[key]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,280 @@
+"""
+Stores of the configurations a search has already seen, keyed by
+Puzzle.state_key(), trading memory for repeated work in different ways
+"""
+from array import array
+from collections import OrderedDict
+
+
+class TranspositionTable:
+    """
+    An exact, unbounded store of the keys of configurations seen by a
+    search, counting how often a key is looked up and found (a hit) or
+    not found (a miss).
+    """
+
+    def __init__(self):
+        """
+        Create a new, empty TranspositionTable self.
+
+        @type self: TranspositionTable
+        @rtype: None
+        """
+        self.hits, self.misses, self.evictions = 0, 0, 0
+        self._keys = set()
+
+    def __contains__(self, key):
+        """
+        Return whether key has been added to TranspositionTable self.
+
+        @type self: TranspositionTable
+        @type key: object
+        @rtype: bool
+
+        >>> table = TranspositionTable()
+        >>> table.add("on")
+        >>> "on" in table, "no" in table
+        (True, False)
+        >>> table.hits, table.misses
+        (1, 1)
+        """
+        if key in self._keys:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, key):
+        """
+        Record key as seen in TranspositionTable self.
+
+        @type self: TranspositionTable
+        @type key: object
+        @rtype: None
+        """
+        self._keys.add(key)
+
+    def __len__(self):
+        """
+        Return the number of keys held by TranspositionTable self.
+
+        @type self: TranspositionTable
+        @rtype: int
+
+        >>> table = TranspositionTable()
+        >>> table.add("on")
+        >>> table.add("on")
+        >>> len(table)
+        1
+        """
+        return len(self._keys)
+
+    def stats(self):
+        """
+        Return the hits, misses, evictions and size of
+        TranspositionTable self.
+
+        @type self: TranspositionTable
+        @rtype: dict[str, int]
+
+        >>> TranspositionTable().stats()
+        {'hits': 0, 'misses': 0, 'evictions': 0, 'size': 0}
+        """
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "size": len(self)}
+
+
+class BoundedTranspositionTable(TranspositionTable):
+    """
+    A TranspositionTable holding at most capacity keys.  When it is full,
+    adding a key evicts the least recently used one, so a configuration
+    may be searched again after it has been forgotten.  Depth-first
+    searches keep the configurations on their current path apart, so
+    they never go round a cycle, but the smaller the capacity, the more
+    often they repeat work.
+    """
+
+    def __init__(self, capacity):
+        """
+        Create a new, empty BoundedTranspositionTable self that holds
+        at most capacity keys.
+
+        @type self: BoundedTranspositionTable
+        @type capacity: int
+        @rtype: None
+        """
+        assert capacity > 0
+        TranspositionTable.__init__(self)
+        self.capacity = capacity
+        # keys from least to most recently used
+        self._keys = OrderedDict()
+
+    def __contains__(self, key):
+        """
+        Return whether key is held by BoundedTranspositionTable self,
+        marking it as recently used if so.
+
+        @type self: BoundedTranspositionTable
+        @type key: object
+        @rtype: bool
+
+        >>> table = BoundedTranspositionTable(2)
+        >>> table.add("a")
+        >>> table.add("b")
+        >>> "a" in table
+        True
+        >>> table.add("c")
+        >>> "a" in table, "b" in table, "c" in table
+        (True, False, True)
+        >>> table.evictions
+        1
+        """
+        if key in self._keys:
+            self._keys.move_to_end(key)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, key):
+        """
+        Record key as seen in BoundedTranspositionTable self, evicting
+        the least recently used key if there is no room.
+
+        @type self: BoundedTranspositionTable
+        @type key: object
+        @rtype: None
+        """
+        self._keys[key] = None
+        self._keys.move_to_end(key)
+        if len(self._keys) > self.capacity:
+            self._keys.popitem(last=False)
+            self.evictions += 1
+
+
+class HashedTranspositionTable(TranspositionTable):
+    """
+    A TranspositionTable storing only a 64-bit hash of each key, 8 bytes
+    per slot in an open-addressed array, however large the keys are.
+
+    Two keys with the same 64-bit hash are taken to be the same, so a
+    search may, very rarely, wrongly skip a configuration it hasn't seen.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Create a new, empty HashedTranspositionTable self with room for
+        capacity keys before it first grows.
+
+        @type self: HashedTranspositionTable
+        @type capacity: int
+        @rtype: None
+        """
+        TranspositionTable.__init__(self)
+        self._bits = max(4, (2 * capacity - 1).bit_length())
+        # a slot holding 0 is empty
+        self._slots = array("Q", bytes(8 << self._bits))
+        self._size = 0
+
+    def __contains__(self, key):
+        """
+        Return whether a key with the same 64-bit hash as key has been
+        added to HashedTranspositionTable self.
+
+        @type self: HashedTranspositionTable
+        @type key: object
+        @rtype: bool
+
+        >>> table = HashedTranspositionTable(1)
+        >>> for word in ["on", "no", "oo", "an"]:
+        ...     table.add(word)
+        >>> "on" in table, "in" in table, len(table)
+        (True, False, 4)
+        """
+        h = _hash64(key)
+        if self._slots[self._slot(h)] == h:
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def add(self, key):
+        """
+        Record the 64-bit hash of key in HashedTranspositionTable self.
+
+        @type self: HashedTranspositionTable
+        @type key: object
+        @rtype: None
+        """
+        h = _hash64(key)
+        i = self._slot(h)
+        if self._slots[i] != h:
+            self._slots[i] = h
+            self._size += 1
+            # keep at most half the slots full, so probes stay short
+            if 2 * self._size > len(self._slots):
+                self._grow()
+
+    def __len__(self):
+        """
+        Return the number of hashes held by HashedTranspositionTable self.
+
+        @type self: HashedTranspositionTable
+        @rtype: int
+        """
+        return self._size
+
+    def _slot(self, h):
+        # Return the index of the slot holding hash h, or of the empty
+        # slot where h belongs if it is not held.
+        #
+        # @type self: HashedTranspositionTable
+        # @type h: int
+        # @rtype: int
+        slots, mask = self._slots, len(self._slots) - 1
+        # the top bits of h pick the first slot to probe
+        i = h >> (64 - self._bits)
+        while slots[i] and slots[i] != h:
+            i = (i + 1) & mask
+        return i
+
+    def _grow(self):
+        # Double the number of slots of self, moving every hash.
+        #
+        # @type self: HashedTranspositionTable
+        # @rtype: None
+        old = self._slots
+        self._bits += 1
+        self._slots = array("Q", bytes(8 << self._bits))
+        for h in old:
+            if h:
+                self._slots[self._slot(h)] = h
+
+
+def _hash64(key):
+    # Return a well-mixed, non-zero 64-bit hash of key.  A non-negative
+    # int, such as a state_hash, is mixed 64 bits at a time, as hash
+    # would first reduce it modulo 2 ** 61 - 1 and make some collide.
+    #
+    # @type key: object
+    # @rtype: int
+    if type(key) is int and key >= 0:
+        h = _mix64(key & 0xFFFFFFFFFFFFFFFF)
+        key >>= 64
+        while key:
+            h = _mix64((h + 0x9E3779B97F4A7C15 ^ key) & 0xFFFFFFFFFFFFFFFF)
+            key >>= 64
+    else:
+        h = _mix64(hash(key) & 0xFFFFFFFFFFFFFFFF)
+    return h or 1
+
+
+def _mix64(h):
+    # Return the 64-bit int h with its bits mixed by the splitmix64
+    # finalizer, which sends different ints to different ints.
+    #
+    # @type h: int
+    # @rtype: int
+    h = ((h ^ (h >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    h = ((h ^ (h >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return h ^ (h >> 31)
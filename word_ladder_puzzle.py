@@ -11,15 +11,18 @@ class WordLadderPuzzle(Puzzle):
         from from_word to to_word using words in ws, changing one
         character at each step.
 
+        ws may be a WordGraph, so that puzzles over the same words share
+        one index; a plain set of words is indexed first.
+
         @type from_word: str
         @type to_word: str
-        @type ws: set[str]
+        @type ws: set[str] | WordGraph
         @rtype: None
         """
+        if not isinstance(ws, WordGraph):
+            ws = WordGraph(ws)
         (self._from_word, self._to_word, self._word_set) = (from_word,
                                                             to_word, ws)
-        # set of characters to use for 1-character changes
-        self._chars = "abcdefghijklmnopqrstuvwxyz"
 
     def __eq__(self, other):
         """
@@ -43,6 +46,34 @@ class WordLadderPuzzle(Puzzle):
                 self._to_word == other._to_word and
                 self._word_set == other._word_set)
 
+    __hash__ = Puzzle.__hash__
+
+    def __reduce__(self):
+        """
+        Return how to rebuild WordLadderPuzzle self when it is unpickled,
+        such as when sent to or from a worker process.  The two words are
+        sent with the WordGraph, which is sent only once however many
+        puzzles sharing it are pickled together, and whose index is
+        rebuilt from its words.
+
+        @type self: WordLadderPuzzle
+        @rtype: tuple
+        """
+        return WordLadderPuzzle, (self._from_word, self._to_word,
+                                  self._word_set)
+
+    def state_key(self):
+        """
+        Return the current word of WordLadderPuzzle self.
+
+        @type self: WordLadderPuzzle
+        @rtype: str
+
+        >>> WordLadderPuzzle("on", "no", {"on", "no"}).state_key()
+        'on'
+        """
+        return self._from_word
+
     def __str__(self):
         """
         Return a  string representation of WordLadderPuzzle self.
@@ -72,24 +103,87 @@ class WordLadderPuzzle(Puzzle):
 
         # convenient names
         from_word, to_word, word_set = self._from_word, self._to_word, self._word_set
-        return_list = []
-        temp_word = self._from_word
-        chars = self._chars
+        if from_word == to_word:
+            return []
+        return [WordLadderPuzzle(word, to_word, word_set)
+                for word in word_set.neighbours(from_word)]
 
-        words_list = []
-        if not from_word == to_word:    # given word is not equals to word,
-            for y in range (len(temp_word)): # alphabet in temporary word
-                for x in range(len(chars)):     # alphabet in chars
+    def moves(self):
+        """
+        Return list of the moves of WordLadderPuzzle self, each a pair of
+        the current word and a word it can change into.
+
+        @type self: WordLadderPuzzle
+        @rtype: list[(str, str)]
+
+        >>> W = WordLadderPuzzle("came", "same", {"came", "same", "lame"})
+        >>> sorted(W.moves())
+        [('came', 'lame'), ('came', 'same')]
+        """
+        from_word = self._from_word
+        if from_word == self._to_word:
+            return []
+        return [(from_word, word)
+                for word in self._word_set.neighbours(from_word)]
 
-                    temp_word = temp_word[:y] + chars[x] + temp_word[y+1:]
-                    # if words is in words.txt file, add the word, otherwise not
-                    if temp_word in word_set:
-                        words_list.append(temp_word)
-                temp_word = from_word
+    def apply(self, move):
+        """
+        Change the current word of WordLadderPuzzle self as move says.
+
+        @type self: WordLadderPuzzle
+        @type move: (str, str)
+        @rtype: None
+        """
+        self._from_word = move[1]
 
-        for words in words_list:
-            return_list.append(WordLadderPuzzle(words, to_word, word_set))
-        return return_list
+    def undo(self, move):
+        """
+        Change the current word of WordLadderPuzzle self back to what it
+        was before move.
+
+        @type self: WordLadderPuzzle
+        @type move: (str, str)
+        @rtype: None
+        """
+        self._from_word = move[0]
+
+    def __copy__(self):
+        """
+        Return a new WordLadderPuzzle like self, sharing its WordGraph.
+
+        @type self: WordLadderPuzzle
+        @rtype: WordLadderPuzzle
+        """
+        return WordLadderPuzzle(self._from_word, self._to_word, self._word_set)
+
+    def goal_state(self):
+        """
+        Return the solved WordLadderPuzzle that self works towards.
+
+        @type self: WordLadderPuzzle
+        @rtype: WordLadderPuzzle
+
+        >>> print(WordLadderPuzzle("on", "no", {"on", "no"}).goal_state())
+        From no To no
+        """
+        return WordLadderPuzzle(self._to_word, self._to_word, self._word_set)
+
+    def reverse_extensions(self):
+        """
+        Return list of WordLadderPuzzles that have self as an extension.
+        A solved puzzle has no extensions, so it is never among them.
+
+        @type self: WordLadderPuzzle
+        @rtype: list[WordLadderPuzzle]
+
+        >>> w = WordLadderPuzzle("same", "lame", {"came", "same", "lame"})
+        >>> sorted(p.state_key() for p in w.reverse_extensions())
+        ['came']
+        """
+        from_word, to_word, word_set = self._from_word, self._to_word, self._word_set
+        return [WordLadderPuzzle(word, to_word, word_set)
+                for word in word_set.predecessors(from_word)
+                if word != to_word]
 
     def is_solved(self):
         """
@@ -108,13 +202,146 @@ class WordLadderPuzzle(Puzzle):
         # solved when the from_word is same as to_word
         return self._from_word == self._to_word
 
+class WordGraph:
+    """
+    An index of a list of words, for finding the words one character
+    change away from any word.
+
+    Each word is filed under its wildcard patterns, such as "s*me" for
+    "same", so the words one change away are those sharing a pattern.
+    As in the original puzzle, a change must put a letter from a to z
+    into the word.
+    """
+
+    # characters that may be put into a word by a 1-character change
+    CHARS = "abcdefghijklmnopqrstuvwxyz"
+
+    def __init__(self, words):
+        """
+        Create a new WordGraph self indexing words.
+
+        @type self: WordGraph
+        @type words: iterable[str]
+        @rtype: None
+        """
+        self._words = set(words)
+        # words by wildcard pattern, e.g. "s*me" -> ["came", "same", ...]
+        self._buckets = {}
+        for word in self._words:
+            for i in range(len(word)):
+                pattern = word[:i] + "*" + word[i + 1:]
+                self._buckets.setdefault(pattern, []).append(word)
+        # neighbours and predecessors already looked up, by word
+        self._neighbours, self._predecessors = {}, {}
+
+    def __eq__(self, other):
+        """
+        Return whether WordGraph self indexes the same words as other.
+
+        @type self: WordGraph
+        @type other: WordGraph | Any
+        @rtype: bool
+
+        >>> WordGraph(["on", "no"]) == WordGraph({"no", "on"})
+        True
+        >>> WordGraph(["on", "no"]) == WordGraph(["on"])
+        False
+        """
+        return self is other or (type(self) == type(other) and
+                                 self._words == other._words)
+
+    def __reduce__(self):
+        """
+        Return how to rebuild WordGraph self when it is unpickled.  Only
+        the words are sent; the index is rebuilt from them.
+
+        @type self: WordGraph
+        @rtype: tuple
+        """
+        return WordGraph, (list(self._words),)
+
+    def __contains__(self, word):
+        """
+        Return whether word is indexed by WordGraph self.
+
+        @type self: WordGraph
+        @type word: str
+        @rtype: bool
+
+        >>> "on" in WordGraph(["on", "no"])
+        True
+        """
+        return word in self._words
+
+    def __len__(self):
+        """
+        Return the number of words indexed by WordGraph self.
+
+        @type self: WordGraph
+        @rtype: int
+
+        >>> len(WordGraph(["on", "no", "on"]))
+        2
+        """
+        return len(self._words)
+
+    def neighbours(self, word):
+        """
+        Return the words of WordGraph self that differ from word by
+        putting one letter from a to z in place of one of its characters.
+
+        @type self: WordGraph
+        @type word: str
+        @rtype: tuple[str]
+
+        >>> g = WordGraph(["came", "same", "lame", "sane", "Same"])
+        >>> sorted(g.neighbours("same"))
+        ['came', 'lame', 'sane']
+        >>> sorted(g.neighbours("Same"))
+        ['came', 'lame', 'same']
+        """
+        if word not in self._neighbours:
+            found = []
+            for i in range(len(word)):
+                pattern = word[:i] + "*" + word[i + 1:]
+                found.extend(w for w in self._buckets.get(pattern, [])
+                             if w != word and w[i] in WordGraph.CHARS)
+            self._neighbours[word] = tuple(found)
+        return self._neighbours[word]
+
+    def predecessors(self, word):
+        """
+        Return the words of WordGraph self that word is a neighbour of.
+
+        @type self: WordGraph
+        @type word: str
+        @rtype: tuple[str]
+
+        >>> g = WordGraph(["came", "same", "lame", "sane", "Same"])
+        >>> sorted(g.predecessors("same"))
+        ['Same', 'came', 'lame', 'sane']
+        >>> sorted(g.predecessors("Same"))
+        []
+        """
+        if word not in self._predecessors:
+            found = []
+            for i in range(len(word)):
+                if word[i] in WordGraph.CHARS:
+                    pattern = word[:i] + "*" + word[i + 1:]
+                    found.extend(w for w in self._buckets.get(pattern, [])
+                                 if w != word)
+            self._predecessors[word] = tuple(found)
+        return self._predecessors[word]
+
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()
     from puzzle_tools import breadth_first_solve, depth_first_solve
+    from puzzle_tools import bidirectional_solve
     from time import time
     with open("words", "r") as words:
-        word_set = set(words.read().split())
+        word_set = WordGraph(words.read().split())
     w = WordLadderPuzzle("same", "cost", word_set)
     start = time()
     sol = breadth_first_solve(w)
@@ -128,3 +355,9 @@ if __name__ == '__main__':
     print("Solving word ladder from same->cost")
     print("...using depth-first-search")
     print("Solutions: {} took {} seconds.".format(sol, end - start))
+    start = time()
+    sol = bidirectional_solve(w)
+    end = time()
+    print("Solving word ladder from same->cost")
+    print("...using bidirectional-breadth-first-search")
+    print("Solutions: {} took {} seconds.".format(sol, end - start))